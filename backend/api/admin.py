@@ -14,12 +14,16 @@ class GroupAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'owner', 'invite_code', 'currency', 'is_active', 'created_at']
     search_fields = ['name', 'invite_code']
     list_filter = ['is_active', 'currency', 'created_at']
+    list_select_related = ['owner']
+    raw_id_fields = ['owner']
 
 
 @admin.register(GroupMembership)
 class GroupMembershipAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'group', 'role', 'joined_at']
     list_filter = ['role', 'joined_at']
+    list_select_related = ['user', 'group']
+    raw_id_fields = ['user', 'group']
 
 
 @admin.register(Category)
@@ -34,12 +38,16 @@ class ExpenseAdmin(admin.ModelAdmin):
     search_fields = ['description']
     list_filter = ['is_settled', 'is_deleted', 'split_type', 'expense_date']
     date_hierarchy = 'expense_date'
+    list_select_related = ['group', 'paid_by']
+    raw_id_fields = ['group', 'paid_by', 'created_by', 'category']
 
 
 @admin.register(ExpenseSplit)
 class ExpenseSplitAdmin(admin.ModelAdmin):
     list_display = ['id', 'expense', 'user', 'amount', 'is_settled']
     list_filter = ['is_settled']
+    list_select_related = ['expense', 'user']
+    raw_id_fields = ['expense', 'user']
 
 
 @admin.register(Settlement)
@@ -47,6 +55,8 @@ class SettlementAdmin(admin.ModelAdmin):
     list_display = ['id', 'group', 'from_user', 'to_user', 'amount', 'settled_at']
     list_filter = ['settled_at']
     date_hierarchy = 'settled_at'
+    list_select_related = ['group', 'from_user', 'to_user']
+    raw_id_fields = ['group', 'from_user', 'to_user', 'created_by']
 
 
 @admin.register(SyncLog)
@@ -54,3 +64,5 @@ class SyncLogAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'entity_type', 'operation', 'is_resolved', 'server_timestamp']
     list_filter = ['entity_type', 'operation', 'is_resolved']
     date_hierarchy = 'server_timestamp'
+    list_select_related = ['user']
+    raw_id_fields = ['user']
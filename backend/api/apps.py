@@ -1,6 +1,21 @@
+import logging
+
 from django.apps import AppConfig
 
 
+logger = logging.getLogger(__name__)
+
+
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        """Initialize the Firebase Admin app once per process."""
+        from api.authentication import get_firebase_app
+
+        try:
+            get_firebase_app()
+        except ValueError as e:
+            # Credentials not configured (e.g. local management commands)
+            logger.warning('Firebase Admin SDK not initialized: %s', e)
@@ -1,11 +1,17 @@
 """
 Firebase Authentication for Django REST Framework.
 """
+import hashlib
+import time
+
 from rest_framework import authentication, exceptions
 from django.conf import settings
+from django.core.cache import cache
 import firebase_admin
 from firebase_admin import auth as firebase_auth, credentials
 
+from api.models import User
+
 
 # Initialize Firebase Admin SDK
 _firebase_app = None
@@ -24,6 +30,24 @@ def get_firebase_app():
     return _firebase_app
 
 
+def verify_firebase_token(token):
+    """
+    Verify a Firebase ID token.
+    Decoded tokens are cached by token hash so repeat requests with the same
+    token skip signature verification until the cache entry or token expires.
+    """
+    key = 'firebase_token:' + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+    decoded_token = cache.get(key)
+    if decoded_token is not None and decoded_token.get('exp', 0) > time.time():
+        return decoded_token
+
+    decoded_token = firebase_auth.verify_id_token(token)
+    timeout = min(settings.FIREBASE_TOKEN_CACHE_TTL, int(decoded_token.get('exp', 0) - time.time()))
+    if timeout > 0:
+        cache.set(key, decoded_token, timeout)
+    return decoded_token
+
+
 class FirebaseAuthentication(authentication.BaseAuthentication):
     """
     Firebase token authentication.
@@ -44,20 +68,18 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         token = parts[1]
 
         try:
-            # Verify the Firebase token
-            get_firebase_app()
-            decoded_token = firebase_auth.verify_id_token(token)
+            # Verify the Firebase token (app is initialized in ApiConfig.ready)
+            decoded_token = verify_firebase_token(token)
             uid = decoded_token.get('uid')
 
             if not uid:
                 raise exceptions.AuthenticationFailed('Invalid token: no UID')
 
             # Get or create user
-            from api.models import User
             user, created = User.objects.get_or_create(
-                firebase_uid=uid,
+                username=uid,
                 defaults={
-                    'username': uid,
+                    'firebase_uid': uid,
                     'email': decoded_token.get('email', ''),
                     'display_name': decoded_token.get('name', ''),
                 }
@@ -65,13 +87,17 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
 
             # Update user info if changed
             if not created:
+                update_fields = []
                 email = decoded_token.get('email')
                 name = decoded_token.get('name')
                 if email and user.email != email:
                     user.email = email
+                    update_fields.append('email')
                 if name and user.display_name != name:
                     user.display_name = name
-                user.save()
+                    update_fields.append('display_name')
+                if update_fields:
+                    user.save(update_fields=update_fields + ['updated_at'])
 
             return (user, decoded_token)
 
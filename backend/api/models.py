@@ -1,15 +1,31 @@
 """
 Database models for Chippin API.
 """
+import functools
+import random
+import string
 import uuid
+from decimal import Decimal
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 
+INVITE_CODE_ALPHABET = string.ascii_uppercase + string.digits
+INVITE_CODE_LENGTH = 8
+INVITE_CODE_CANDIDATES = 8
+
+_system_random = random.SystemRandom()
+
+
 class User(AbstractUser):
     """Extended user model with Firebase integration."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    firebase_uid = models.CharField(max_length=128, unique=True, null=True, blank=True)
+    # Firebase users are looked up by username, which is set to the UID and
+    # already carries a unique index, so this column is not indexed again.
+    firebase_uid = models.CharField(max_length=128, null=True, blank=True)
     display_name = models.CharField(max_length=255, blank=True)
     avatar_url = models.URLField(blank=True, null=True)
     is_guest = models.BooleanField(default=False)
@@ -23,6 +39,36 @@ class User(AbstractUser):
         return self.display_name or self.email or str(self.id)
 
 
+class GroupQuerySet(models.QuerySet):
+    """Query helpers for groups."""
+
+    def with_member_count(self):
+        """Annotate member_count using a correlated subquery."""
+        member_count = GroupMembership.objects.filter(
+            group=OuterRef('pk')
+        ).order_by().values('group').annotate(count=Count('id')).values('count')
+
+        return self.annotate(member_count=Coalesce(Subquery(member_count), 0))
+
+    def with_stats(self):
+        """
+        Annotate member_count and total_expenses using correlated subqueries,
+        so serializers read them from the row instead of querying per group.
+        """
+        total_expenses = Expense.objects.filter(
+            group=OuterRef('pk'),
+            is_deleted=False
+        ).order_by().values('group').annotate(total=Sum('amount')).values('total')
+
+        return self.with_member_count().annotate(
+            total_expenses=Coalesce(
+                Subquery(total_expenses),
+                Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+
+
 class Group(models.Model):
     """Expense sharing group."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -37,6 +83,8 @@ class Group(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = GroupQuerySet.as_manager()
+
     class Meta:
         db_table = 'groups'
         ordering = ['-created_at']
@@ -50,13 +98,18 @@ class Group(models.Model):
         super().save(*args, **kwargs)
 
     def _generate_invite_code(self):
-        """Generate a unique invite code."""
-        import random
-        import string
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        while Group.objects.filter(invite_code=code).exists():
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        return code
+        """Generate a unique invite code, checking a batch of candidates per query."""
+        while True:
+            candidates = {
+                ''.join(_system_random.choices(INVITE_CODE_ALPHABET, k=INVITE_CODE_LENGTH))
+                for _ in range(INVITE_CODE_CANDIDATES)
+            }
+            taken = set(
+                Group.objects.filter(invite_code__in=candidates).values_list('invite_code', flat=True)
+            )
+            available = candidates - taken
+            if available:
+                return available.pop()
 
 
 class GroupMembership(models.Model):
@@ -109,6 +162,15 @@ class Category(models.Model):
         return f"{self.icon} {self.name}"
 
 
+@functools.lru_cache(maxsize=None)
+def get_preset_categories():
+    """Return the preset categories as API payloads, built once per process."""
+    return tuple(
+        {'id': key, 'name': name, 'icon': icon, 'is_preset': True}
+        for key, name, icon in Category.PRESET_CATEGORIES
+    )
+
+
 class Expense(models.Model):
     """Expense record."""
     SPLIT_TYPE_CHOICES = [
@@ -143,6 +205,13 @@ class Expense(models.Model):
     class Meta:
         db_table = 'expenses'
         ordering = ['-expense_date', '-created_at']
+        indexes = [
+            models.Index(fields=['group', 'is_deleted', '-expense_date', '-created_at'], name='expense_group_date_idx'),
+            models.Index(fields=['paid_by', 'is_settled'], name='expense_paid_by_settled_idx'),
+            models.Index(fields=['group', 'category', 'is_deleted'], name='expense_group_category_idx'),
+            models.Index(fields=['group', 'is_settled', 'is_deleted'], name='expense_group_settled_idx'),
+            models.Index(fields=['group', 'updated_at'], name='expense_group_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} - {self.amount}"
@@ -162,10 +231,30 @@ class ExpenseSplit(models.Model):
     class Meta:
         db_table = 'expense_splits'
         unique_together = ['expense', 'user']
+        indexes = [
+            models.Index(fields=['user', 'is_settled'], name='split_user_settled_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} owes {self.amount}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._touch_expense()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._touch_expense()
+        return result
+
+    def _touch_expense(self):
+        """
+        Bump the parent expense's updated_at so single-split edits (e.g. from the
+        admin) reach sync pulls and move the cached balance totals' version.
+        The API writes splits with bulk_create, which bypasses this.
+        """
+        Expense.objects.filter(pk=self.expense_id).update(updated_at=timezone.now())
+
 
 class Settlement(models.Model):
     """Settlement between two users."""
@@ -181,6 +270,9 @@ class Settlement(models.Model):
     class Meta:
         db_table = 'settlements'
         ordering = ['-settled_at']
+        indexes = [
+            models.Index(fields=['group', '-settled_at'], name='settlement_group_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.from_user} paid {self.to_user} {self.amount}"
@@ -188,17 +280,26 @@ class Settlement(models.Model):
 
 class SyncLog(models.Model):
     """Sync operation log for conflict resolution."""
+    # Stored as small integers; map the API's string names with the *_IDS dicts
     OPERATION_CHOICES = [
-        ('create', 'Create'),
-        ('update', 'Update'),
-        ('delete', 'Delete'),
+        (1, 'Create'),
+        (2, 'Update'),
+        (3, 'Delete'),
     ]
+    ENTITY_TYPE_CHOICES = [
+        (1, 'Expense'),
+        (2, 'Group'),
+        (3, 'Settlement'),
+    ]
+    OPERATION_IDS = {label.lower(): value for value, label in OPERATION_CHOICES}
+    ENTITY_TYPE_IDS = {label.lower(): value for value, label in ENTITY_TYPE_CHOICES}
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Append-only audit table that is never exposed through the API, so it
+    # keeps the default BigAutoField key for compact, insert-ordered indexes.
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    entity_type = models.CharField(max_length=50)  # 'expense', 'group', etc.
+    entity_type = models.PositiveSmallIntegerField(choices=ENTITY_TYPE_CHOICES)
     entity_id = models.UUIDField()
-    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES)
+    operation = models.PositiveSmallIntegerField(choices=OPERATION_CHOICES)
     data = models.JSONField(default=dict)
     client_timestamp = models.DateTimeField()
     server_timestamp = models.DateTimeField(auto_now_add=True)
@@ -207,6 +308,9 @@ class SyncLog(models.Model):
     class Meta:
         db_table = 'sync_logs'
         ordering = ['-server_timestamp']
+        indexes = [
+            models.Index(fields=['user', 'entity_type', '-server_timestamp'], name='synclog_user_entity_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.operation} {self.entity_type} {self.entity_id}"
+        return f"{self.get_operation_display()} {self.get_entity_type_display()} {self.entity_id}"
@@ -3,6 +3,37 @@ Custom permissions for Chippin API.
 """
 from rest_framework import permissions
 
+from api.models import GroupMembership
+
+
+def get_group_role(request, group_id):
+    """
+    Return the requesting user's membership role in a group, or None.
+    Roles are cached on the request so stacked permission checks share one query.
+    """
+    roles = getattr(request, '_group_roles', None)
+    if roles is None:
+        roles = request._group_roles = {}
+    if group_id not in roles:
+        roles[group_id] = GroupMembership.objects.filter(
+            user_id=request.user.id,
+            group_id=group_id
+        ).values_list('role', flat=True).first()
+    return roles[group_id]
+
+
+def get_user_group_ids(request):
+    """
+    Return the ids of the groups the requesting user belongs to.
+    Cached on the request so repeated get_queryset calls share one query.
+    """
+    group_ids = getattr(request, '_user_group_ids', None)
+    if group_ids is None:
+        group_ids = request._user_group_ids = frozenset(
+            GroupMembership.objects.filter(user_id=request.user.id).values_list('group_id', flat=True)
+        )
+    return group_ids
+
 
 class IsGroupMember(permissions.BasePermission):
     """
@@ -13,13 +44,13 @@ class IsGroupMember(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Handle both Group objects and objects with a 'group' field
         if hasattr(obj, 'members'):
-            group = obj
-        elif hasattr(obj, 'group'):
-            group = obj.group
+            group_id = obj.id
+        elif hasattr(obj, 'group_id'):
+            group_id = obj.group_id
         else:
             return False
 
-        return group.members.filter(id=request.user.id).exists()
+        return get_group_role(request, group_id) is not None
 
 
 class IsGroupOwnerOrAdmin(permissions.BasePermission):
@@ -29,8 +60,6 @@ class IsGroupOwnerOrAdmin(permissions.BasePermission):
     message = "You must be the owner or admin of this group."
 
     def has_object_permission(self, request, view, obj):
-        from api.models import GroupMembership
-
         if hasattr(obj, 'members'):
             group = obj
         elif hasattr(obj, 'group'):
@@ -39,15 +68,11 @@ class IsGroupOwnerOrAdmin(permissions.BasePermission):
             return False
 
         # Check if owner
-        if group.owner == request.user:
+        if group.owner_id == request.user.id:
             return True
 
         # Check membership role
-        try:
-            membership = GroupMembership.objects.get(user=request.user, group=group)
-            return membership.role in ['owner', 'admin']
-        except GroupMembership.DoesNotExist:
-            return False
+        return get_group_role(request, group.id) in ('owner', 'admin')
 
 
 class IsExpenseOwner(permissions.BasePermission):
@@ -58,11 +83,11 @@ class IsExpenseOwner(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Allow group owner/admin
-        if obj.group.owner == request.user:
+        if obj.group.owner_id == request.user.id:
             return True
 
         # Allow expense creator
-        return obj.created_by == request.user
+        return obj.created_by_id == request.user.id
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -76,9 +101,9 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions only for owner
-        if hasattr(obj, 'owner'):
-            return obj.owner == request.user
-        if hasattr(obj, 'created_by'):
-            return obj.created_by == request.user
+        if hasattr(obj, 'owner_id'):
+            return obj.owner_id == request.user.id
+        if hasattr(obj, 'created_by_id'):
+            return obj.created_by_id == request.user.id
 
         return False
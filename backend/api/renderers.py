@@ -0,0 +1,33 @@
+"""
+Response renderers for Chippin API.
+"""
+import decimal
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Encode types orjson does not handle natively (Decimal, lazy strings, querysets)."""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return _fallback_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+    UUIDs, dates and datetimes are encoded natively; everything else falls
+    back to DRF's encoder rules.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON bytes."""
+        if data is None:
+            return b''
+        # DRF keys list-field errors by item index, so non-str keys must be allowed
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
@@ -2,7 +2,10 @@
 Serializers for Chippin API.
 """
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from decimal import Decimal
+import uuid
 from .models import User, Group, GroupMembership, Category, Expense, ExpenseSplit, Settlement, SyncLog
 
 
@@ -79,11 +82,34 @@ class ExpenseSerializer(serializers.ModelSerializer):
         """Validate split amounts match total."""
         split_data = data.get('split_data', [])
         if split_data:
-            total_split = sum(Decimal(str(s.get('amount', 0))) for s in split_data)
+            # Convert each amount once; create() reuses the converted values
+            for split in split_data:
+                split['amount'] = Decimal(str(split.get('amount', 0)))
+            total_split = sum((s['amount'] for s in split_data), Decimal('0'))
             if abs(total_split - data['amount']) > Decimal('0.01'):
                 raise serializers.ValidationError({
                     'split_data': f"Split amounts ({total_split}) must equal expense amount ({data['amount']})"
                 })
+
+            # Compare ids as UUIDs so any valid spelling (case, hyphens) matches
+            for split in split_data:
+                try:
+                    split['user_id'] = uuid.UUID(str(split.get('user_id')))
+                except ValueError:
+                    raise serializers.ValidationError({
+                        'split_data': "Each split needs a valid user_id."
+                    })
+
+            # Check split users against the group's members in one query
+            group = data.get('group') or getattr(self.instance, 'group', None)
+            if group is not None:
+                member_ids = set(
+                    GroupMembership.objects.filter(group=group).values_list('user_id', flat=True)
+                )
+                if any(s['user_id'] not in member_ids for s in split_data):
+                    raise serializers.ValidationError({
+                        'split_data': "Split users must be members of the group."
+                    })
         return data
 
     def create(self, validated_data):
@@ -91,43 +117,49 @@ class ExpenseSerializer(serializers.ModelSerializer):
         split_data = validated_data.pop('split_data', [])
         validated_data['created_by'] = self.context['request'].user
 
-        expense = Expense.objects.create(**validated_data)
-
-        # Create splits
-        if split_data:
-            for split in split_data:
-                ExpenseSplit.objects.create(
-                    expense=expense,
-                    user_id=split['user_id'],
-                    amount=split['amount'],
-                    percentage=split.get('percentage'),
-                    shares=split.get('shares', 1)
-                )
-        else:
-            # Create equal splits for all group members
-            self._create_equal_splits(expense)
-
+        with transaction.atomic():
+            expense = Expense.objects.create(**validated_data)
+
+            # Create splits
+            if split_data:
+                ExpenseSplit.objects.bulk_create([
+                    ExpenseSplit(
+                        expense=expense,
+                        user_id=split['user_id'],
+                        amount=split['amount'],
+                        percentage=split.get('percentage'),
+                        shares=split.get('shares', 1)
+                    )
+                    for split in split_data
+                ], batch_size=500)
+            else:
+                # Create equal splits for all group members
+                self._create_equal_splits(expense)
+
+        # Load the new splits with their users in one query for the response
+        prefetch_related_objects(
+            [expense], Prefetch('splits', queryset=ExpenseSplit.objects.select_related('user'))
+        )
         return expense
 
     def _create_equal_splits(self, expense):
         """Create equal splits for all group members."""
-        members = expense.group.members.all()
-        if not members:
+        member_ids = list(expense.group.members.values_list('id', flat=True))
+        if not member_ids:
             return
 
-        per_person = expense.amount / len(members)
-        # Handle rounding - give extra cents to first person
-        remainder = expense.amount - (per_person * len(members))
-
-        for i, member in enumerate(members):
-            amount = per_person
-            if i == 0:
-                amount += remainder
-            ExpenseSplit.objects.create(
-                expense=expense,
-                user=member,
-                amount=amount
-            )
+        # Work in whole cents; leftover cents go one each to the first members
+        cents = int(expense.amount * 100)
+        per_person, extra = divmod(cents, len(member_ids))
+        amounts = [
+            Decimal(per_person + (1 if i < extra else 0)) / 100
+            for i in range(len(member_ids))
+        ]
+
+        ExpenseSplit.objects.bulk_create([
+            ExpenseSplit(expense=expense, user_id=user_id, amount=amount)
+            for user_id, amount in zip(member_ids, amounts)
+        ], batch_size=500)
 
 
 class ExpenseListSerializer(serializers.ModelSerializer):
@@ -147,8 +179,8 @@ class GroupSerializer(serializers.ModelSerializer):
     """Group serializer."""
     owner_details = UserMinimalSerializer(source='owner', read_only=True)
     memberships = GroupMembershipSerializer(source='groupmembership_set', many=True, read_only=True)
-    member_count = serializers.SerializerMethodField()
-    total_expenses = serializers.SerializerMethodField()
+    member_count = serializers.IntegerField(read_only=True)
+    total_expenses = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Group
@@ -159,26 +191,15 @@ class GroupSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'owner', 'invite_code', 'created_at', 'updated_at']
 
-    def get_member_count(self, obj):
-        return obj.members.count()
-
-    def get_total_expenses(self, obj):
-        from django.db.models import Sum
-        result = obj.expenses.filter(is_deleted=False).aggregate(Sum('amount'))
-        return float(result['amount__sum'] or 0)
-
 
 class GroupListSerializer(serializers.ModelSerializer):
     """Lightweight group serializer for list views."""
-    member_count = serializers.SerializerMethodField()
+    member_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Group
         fields = ['id', 'name', 'currency', 'image_url', 'member_count', 'updated_at']
 
-    def get_member_count(self, obj):
-        return obj.members.count()
-
 
 class GroupCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating a group."""
@@ -191,14 +212,16 @@ class GroupCreateSerializer(serializers.ModelSerializer):
         """Create group and add owner as member."""
         user = self.context['request'].user
         validated_data['owner'] = user
-        group = Group.objects.create(**validated_data)
 
-        # Add owner as member with owner role
-        GroupMembership.objects.create(
-            user=user,
-            group=group,
-            role='owner'
-        )
+        with transaction.atomic():
+            group = Group.objects.create(**validated_data)
+
+            # Add owner as member with owner role
+            GroupMembership.objects.create(
+                user=user,
+                group=group,
+                role='owner'
+            )
 
         return group
 
@@ -219,16 +242,14 @@ class JoinGroupSerializer(serializers.Serializer):
     def create(self, validated_data):
         """Add user to group."""
         user = self.context['request'].user
-        
-        # Check if already a member
-        if GroupMembership.objects.filter(user=user, group=self.group).exists():
-            raise serializers.ValidationError({"invite_code": "Already a member of this group."})
 
-        GroupMembership.objects.create(
+        _, created = GroupMembership.objects.get_or_create(
             user=user,
             group=self.group,
-            role='member'
+            defaults={'role': 'member'}
         )
+        if not created:
+            raise serializers.ValidationError({"invite_code": "Already a member of this group."})
 
         return self.group
 
@@ -259,12 +280,20 @@ class SyncPushSerializer(serializers.Serializer):
     """Serializer for sync push operation."""
     entity_type = serializers.ChoiceField(choices=['expense', 'group', 'settlement'])
     operation = serializers.ChoiceField(choices=['create', 'update', 'delete'])
-    entity_id = serializers.CharField()
+    entity_id = serializers.UUIDField()
     local_id = serializers.CharField(required=False)
     data = serializers.DictField()
     client_timestamp = serializers.DateTimeField()
 
 
+class MinimalSyncResponseSerializer(serializers.ModelSerializer):
+    """Version fields returned for a pushed expense the client already holds."""
+
+    class Meta:
+        model = Expense
+        fields = ['id', 'sync_version', 'updated_at', 'last_synced_at']
+
+
 class SyncPullSerializer(serializers.Serializer):
     """Serializer for sync pull request."""
     last_sync = serializers.DateTimeField(required=False, allow_null=True)
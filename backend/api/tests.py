@@ -9,16 +9,24 @@ Tests cover:
 - Sync operations
 """
 
+from django.core.cache import cache
 from django.test import TestCase, Client
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
+from rest_framework.throttling import ScopedRateThrottle
 from unittest.mock import patch, MagicMock
+from django.db.models import Sum
+from collections import defaultdict
+from datetime import timedelta
 from decimal import Decimal
 import json
 import uuid
 
-from .models import User, Group, GroupMember, Expense, ExpenseSplit, Settlement
+from .models import User, Group, GroupMembership, Expense, ExpenseSplit, Settlement, SyncLog
+from .renderers import ORJSONRenderer
+from .views.auth_views import VERIFY_BATCH_MAX_TOKENS
 
 
 class UserModelTests(TestCase):
@@ -56,8 +64,9 @@ class UserModelTests(TestCase):
 class GroupModelTests(TestCase):
     """Tests for the Group model."""
 
-    def setUp(self):
-        self.owner = User.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(
             firebase_uid='owner_uid',
             email='owner@example.com',
             display_name='Owner'
@@ -91,32 +100,34 @@ class GroupModelTests(TestCase):
             name='Test Group',
             owner=self.owner
         )
-        GroupMember.objects.create(group=group, user=self.owner, role='owner')
-        self.assertEqual(group.member_count, 1)
+        GroupMembership.objects.create(group=group, user=self.owner, role='owner')
+        self.assertEqual(Group.objects.with_member_count().get(pk=group.pk).member_count, 1)
 
         # Add another member
         member = User.objects.create(
+            username='member',
             email='member@example.com',
             display_name='Member'
         )
-        GroupMember.objects.create(group=group, user=member, role='member')
-        self.assertEqual(group.member_count, 2)
+        GroupMembership.objects.create(group=group, user=member, role='member')
+        self.assertEqual(Group.objects.with_member_count().get(pk=group.pk).member_count, 2)
 
 
 class ExpenseModelTests(TestCase):
     """Tests for the Expense model."""
 
-    def setUp(self):
-        self.owner = User.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(
             firebase_uid='owner_uid',
             email='owner@example.com',
             display_name='Owner'
         )
-        self.group = Group.objects.create(
+        cls.group = Group.objects.create(
             name='Test Group',
-            owner=self.owner
+            owner=cls.owner
         )
-        GroupMember.objects.create(group=self.group, user=self.owner, role='owner')
+        GroupMembership.objects.create(group=cls.group, user=cls.owner, role='owner')
 
     def test_create_expense(self):
         """Test creating an expense."""
@@ -126,6 +137,7 @@ class ExpenseModelTests(TestCase):
             amount=Decimal('100.00'),
             paid_by=self.owner,
             created_by=self.owner,
+            expense_date='2024-01-01',
             split_type='equal'
         )
         self.assertEqual(expense.description, 'Dinner')
@@ -140,6 +152,7 @@ class ExpenseModelTests(TestCase):
             amount=Decimal('100.00'),
             paid_by=self.owner,
             created_by=self.owner,
+            expense_date='2024-01-01',
             split_type='equal'
         )
         # Create split
@@ -155,64 +168,58 @@ class ExpenseModelTests(TestCase):
 class BalanceCalculationTests(TestCase):
     """Tests for balance calculation logic."""
 
-    def setUp(self):
-        self.user1 = User.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create(
+            username='user1',
             email='user1@example.com',
             display_name='User 1'
         )
-        self.user2 = User.objects.create(
+        cls.user2 = User.objects.create(
+            username='user2',
             email='user2@example.com',
             display_name='User 2'
         )
-        self.group = Group.objects.create(
+        cls.group = Group.objects.create(
             name='Test Group',
-            owner=self.user1
+            owner=cls.user1
         )
-        GroupMember.objects.create(group=self.group, user=self.user1, role='owner')
-        GroupMember.objects.create(group=self.group, user=self.user2, role='member')
+        GroupMembership.objects.create(group=cls.group, user=cls.user1, role='owner')
+        GroupMembership.objects.create(group=cls.group, user=cls.user2, role='member')
 
-    def test_equal_split_balance(self):
-        """Test balance calculation with equal splits."""
-        # User1 pays 100, split equally between 2 users
+        # User1 pays 100, split equally between 2 users (shared by every test)
         expense = Expense.objects.create(
-            group=self.group,
+            group=cls.group,
             description='Dinner',
             amount=Decimal('100.00'),
-            paid_by=self.user1,
-            created_by=self.user1,
+            paid_by=cls.user1,
+            created_by=cls.user1,
+            expense_date='2024-01-01',
             split_type='equal'
         )
-        ExpenseSplit.objects.create(expense=expense, user=self.user1, amount=Decimal('50.00'))
-        ExpenseSplit.objects.create(expense=expense, user=self.user2, amount=Decimal('50.00'))
+        ExpenseSplit.objects.create(expense=expense, user=cls.user1, amount=Decimal('50.00'))
+        ExpenseSplit.objects.create(expense=expense, user=cls.user2, amount=Decimal('50.00'))
 
+    def test_equal_split_balance(self):
+        """Test balance calculation with equal splits."""
         # Calculate balances
         balances = self._calculate_balances()
         
         # User1 paid 100, owes 50 = +50 (gets back 50)
         # User2 paid 0, owes 50 = -50 (owes 50)
-        self.assertEqual(balances[str(self.user1.id)], Decimal('50.00'))
-        self.assertEqual(balances[str(self.user2.id)], Decimal('-50.00'))
+        self.assertEqual(balances[self.user1.id], Decimal('50.00'))
+        self.assertEqual(balances[self.user2.id], Decimal('-50.00'))
 
     def test_multiple_expenses_balance(self):
         """Test balance with multiple expenses."""
-        # User1 pays 100
-        expense1 = Expense.objects.create(
-            group=self.group,
-            description='Dinner',
-            amount=Decimal('100.00'),
-            paid_by=self.user1,
-            created_by=self.user1
-        )
-        ExpenseSplit.objects.create(expense=expense1, user=self.user1, amount=Decimal('50.00'))
-        ExpenseSplit.objects.create(expense=expense1, user=self.user2, amount=Decimal('50.00'))
-
-        # User2 pays 60
+        # User1 pays 100 (from setUpTestData), User2 pays 60
         expense2 = Expense.objects.create(
             group=self.group,
             description='Lunch',
             amount=Decimal('60.00'),
             paid_by=self.user2,
-            created_by=self.user2
+            created_by=self.user2,
+            expense_date='2024-01-01'
         )
         ExpenseSplit.objects.create(expense=expense2, user=self.user1, amount=Decimal('30.00'))
         ExpenseSplit.objects.create(expense=expense2, user=self.user2, amount=Decimal('30.00'))
@@ -221,40 +228,123 @@ class BalanceCalculationTests(TestCase):
         
         # User1: paid 100, owes 80 = +20
         # User2: paid 60, owes 80 = -20
-        self.assertEqual(balances[str(self.user1.id)], Decimal('20.00'))
-        self.assertEqual(balances[str(self.user2.id)], Decimal('-20.00'))
+        self.assertEqual(balances[self.user1.id], Decimal('20.00'))
+        self.assertEqual(balances[self.user2.id], Decimal('-20.00'))
 
     def _calculate_balances(self):
         """Helper to calculate balances for the group."""
-        balances = {}
-        expenses = Expense.objects.filter(group=self.group, is_deleted=False)
-        
-        for expense in expenses:
-            paid_by_id = str(expense.paid_by.id)
-            balances[paid_by_id] = balances.get(paid_by_id, Decimal('0')) + expense.amount
-            
-            for split in expense.splits.all():
-                user_id = str(split.user.id)
-                balances[user_id] = balances.get(user_id, Decimal('0')) - split.amount
-        
+        balances = defaultdict(Decimal)
+
+        # Aggregate in the database and read plain (user_id, total) tuples
+        paid = Expense.objects.filter(
+            group=self.group, is_deleted=False
+        ).values_list('paid_by_id').annotate(total=Sum('amount'))
+        owed = ExpenseSplit.objects.filter(
+            expense__group=self.group, expense__is_deleted=False
+        ).values_list('user_id').annotate(total=Sum('amount'))
+
+        for user_id, total in paid:
+            balances[user_id] += total
+        for user_id, total in owed:
+            balances[user_id] -= total
+
         return balances
 
 
+class BalancesAPITests(APITestCase):
+    """Tests that cached balances follow settlement and membership changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create(username='bal_user1', display_name='User 1')
+        cls.user2 = User.objects.create(username='bal_user2', display_name='User 2')
+        cls.user3 = User.objects.create(username='bal_user3', display_name='User 3')
+        cls.group = Group.objects.create(name='Balance Group', owner=cls.user1)
+        GroupMembership.objects.create(group=cls.group, user=cls.user1, role='owner')
+        GroupMembership.objects.create(group=cls.group, user=cls.user2, role='member')
+        expense = Expense.objects.create(
+            group=cls.group, description='Dinner', amount=Decimal('100.00'),
+            paid_by=cls.user1, created_by=cls.user1, expense_date='2024-01-01'
+        )
+        ExpenseSplit.objects.create(expense=expense, user=cls.user1, amount=Decimal('50.00'))
+        ExpenseSplit.objects.create(expense=expense, user=cls.user2, amount=Decimal('50.00'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user1)
+
+    def _balances(self):
+        response = self.client.get(f'/api/groups/{self.group.id}/balances/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {b['user']['id']: b['balance'] for b in json.loads(response.content)['balances']}
+
+    def test_settlement_payee_change(self):
+        """Changing who received a settlement is reflected immediately."""
+        settlement = Settlement.objects.create(
+            group=self.group, from_user=self.user2, to_user=self.user1,
+            amount=Decimal('10.00'), created_by=self.user2
+        )
+        GroupMembership.objects.create(group=self.group, user=self.user3, role='member')
+        before = self._balances()
+
+        settlement.to_user = self.user3
+        settlement.save()
+
+        after = self._balances()
+        self.assertNotEqual(before[str(self.user1.id)], after[str(self.user1.id)])
+        self.assertNotEqual(before[str(self.user3.id)], after[str(self.user3.id)])
+
+    def test_direct_split_edits(self):
+        """Split edits made outside the API are reflected immediately."""
+        before = self._balances()
+        split = ExpenseSplit.objects.get(expense__group=self.group, user=self.user2)
+
+        # Bulk amount edit, as from a shell or data fix
+        ExpenseSplit.objects.filter(pk=split.pk).update(amount=Decimal('40.00'))
+        after_update = self._balances()
+        self.assertNotEqual(before[str(self.user2.id)], after_update[str(self.user2.id)])
+
+        # Single-row save moving the split to another member, as from the admin
+        GroupMembership.objects.create(group=self.group, user=self.user3, role='member')
+        self._balances()
+        split.refresh_from_db()
+        split.user = self.user3
+        split.save()
+        after_save = self._balances()
+        self.assertEqual(after_save[str(self.user2.id)], 0)
+        self.assertEqual(after_save[str(self.user3.id)], -40)
+
+    def test_member_swap(self):
+        """Replacing a member with another lists the new member only."""
+        self.assertIn(str(self.user2.id), self._balances())
+
+        GroupMembership.objects.filter(group=self.group, user=self.user2).delete()
+        GroupMembership.objects.create(group=self.group, user=self.user3, role='member')
+
+        balances = self._balances()
+        self.assertNotIn(str(self.user2.id), balances)
+        self.assertIn(str(self.user3.id), balances)
+
+
 class SettlementTests(TestCase):
     """Tests for settlement functionality."""
 
-    def setUp(self):
-        self.user1 = User.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create(
+            username='user1',
             email='user1@example.com',
             display_name='User 1'
         )
-        self.user2 = User.objects.create(
+        cls.user2 = User.objects.create(
+            username='user2',
             email='user2@example.com',
             display_name='User 2'
         )
-        self.group = Group.objects.create(
+        cls.group = Group.objects.create(
             name='Test Group',
-            owner=self.user1
+            owner=cls.user1
         )
 
     def test_create_settlement(self):
@@ -274,14 +364,17 @@ class SettlementTests(TestCase):
 class APIAuthenticationTests(APITestCase):
     """Tests for API authentication."""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = User.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             firebase_uid='test_uid',
             email='test@example.com',
             display_name='Test User'
         )
 
+    def setUp(self):
+        self.client = APIClient()
+
     @patch('api.authentication.FirebaseAuthentication.authenticate')
     def test_authenticated_request(self, mock_auth):
         """Test that authenticated requests work."""
@@ -300,16 +393,83 @@ class APIAuthenticationTests(APITestCase):
         pass
 
 
+def _fake_verify(token):
+    """Stand-in for verify_firebase_token that rejects tokens starting with 'bad'."""
+    if token.startswith('bad'):
+        raise ValueError(f'Invalid token {token}')
+    return {'uid': f'uid-{token}'}
+
+
+@patch('api.views.auth_views.verify_firebase_token', side_effect=_fake_verify)
+class VerifyTokenBatchTests(APITestCase):
+    """Tests for the batch token verification endpoint."""
+
+    url = '/api/auth/verify_batch'
+
+    def setUp(self):
+        # Throttle history lives in the cache
+        cache.clear()
+
+    def test_results_follow_token_order(self, mock_verify):
+        """Each result sits at the index of its token."""
+        tokens = [f'token{i}' for i in range(20)]
+        response = self.client.post(self.url, {'tokens': tokens}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['uid'] for r in response.data['results']], [f'uid-{t}' for t in tokens])
+        self.assertTrue(all(r['valid'] for r in response.data['results']))
+
+    def test_bad_token_only_fails_its_own_entry(self, mock_verify):
+        """A rejected token is reported in its own entry without affecting the others."""
+        response = self.client.post(self.url, {'tokens': ['one', 'bad-two', 'three']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['valid'] for r in results], [True, False, True])
+        self.assertIsNone(results[1]['uid'])
+        self.assertEqual(results[1]['error'], 'Invalid token')
+        self.assertIsNone(results[0]['error'])
+        self.assertIsNone(results[2]['error'])
+
+    def test_tokens_must_be_non_empty_list(self, mock_verify):
+        """Missing, empty and non-list tokens are rejected."""
+        for body in ({}, {'tokens': []}, {'tokens': 'token'}, {'tokens': {'a': 'token'}}):
+            response = self.client.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+        mock_verify.assert_not_called()
+
+    def test_too_many_tokens(self, mock_verify):
+        """More than VERIFY_BATCH_MAX_TOKENS tokens are rejected."""
+        tokens = ['token'] * (VERIFY_BATCH_MAX_TOKENS + 1)
+        response = self.client.post(self.url, {'tokens': tokens}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_verify.assert_not_called()
+
+    def test_requests_are_throttled(self, mock_verify):
+        """Callers over the verify_batch rate get 429."""
+        with patch.dict(ScopedRateThrottle.THROTTLE_RATES, {'verify_batch': '2/minute'}):
+            for _ in range(2):
+                response = self.client.post(self.url, {'tokens': ['token']}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.post(self.url, {'tokens': ['token']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
 class GroupAPITests(APITestCase):
     """Tests for Group API endpoints."""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = User.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             firebase_uid='test_uid',
             email='test@example.com',
             display_name='Test User'
         )
+
+    def setUp(self):
+        self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
     def test_list_groups(self):
@@ -318,7 +478,7 @@ class GroupAPITests(APITestCase):
             name='Test Group',
             owner=self.user
         )
-        GroupMember.objects.create(group=group, user=self.user, role='owner')
+        GroupMembership.objects.create(group=group, user=self.user, role='owner')
         
         # If you have a groups list endpoint
         # response = self.client.get('/api/groups/')
@@ -338,21 +498,58 @@ class GroupAPITests(APITestCase):
         pass
 
 
-class ExpenseAPITests(APITestCase):
-    """Tests for Expense API endpoints."""
+class GroupPermissionTests(APITestCase):
+    """Tests for owner/admin-only group actions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='perm_owner', display_name='Owner')
+        cls.member = User.objects.create(username='perm_member', display_name='Member')
+        cls.group = Group.objects.create(name='Perm Group', owner=cls.owner)
+        GroupMembership.objects.create(group=cls.group, user=cls.owner, role='owner')
+        GroupMembership.objects.create(group=cls.group, user=cls.member, role='member')
 
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create(
+
+    def test_anonymous_caller_is_rejected(self):
+        """Unauthenticated requests are refused before the group is looked up."""
+        for action in ('remove_member', 'regenerate_invite'):
+            response = self.client.post(
+                f'/api/groups/{self.group.id}/{action}/', {'user_id': str(self.member.id)}, format='json'
+            )
+            self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertTrue(GroupMembership.objects.filter(group=self.group, user=self.member).exists())
+
+    def test_plain_member_is_forbidden(self):
+        """Members without the owner or admin role get 403."""
+        self.client.force_authenticate(user=self.member)
+        for action in ('remove_member', 'regenerate_invite'):
+            response = self.client.post(
+                f'/api/groups/{self.group.id}/{action}/', {'user_id': str(self.owner.id)}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).invite_code, self.group.invite_code)
+
+
+class ExpenseAPITests(APITestCase):
+    """Tests for Expense API endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             firebase_uid='test_uid',
             email='test@example.com',
             display_name='Test User'
         )
-        self.group = Group.objects.create(
+        cls.group = Group.objects.create(
             name='Test Group',
-            owner=self.user
+            owner=cls.user
         )
-        GroupMember.objects.create(group=self.group, user=self.user, role='owner')
+        GroupMembership.objects.create(group=cls.group, user=cls.user, role='owner')
+
+    def setUp(self):
+        self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
     def test_create_expense(self):
@@ -370,17 +567,46 @@ class ExpenseAPITests(APITestCase):
         # self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         pass
 
+    def test_split_user_ids_accept_any_uuid_spelling(self):
+        """Split user ids match members regardless of case or hyphens."""
+        for user_id in (str(self.user.id).upper(), self.user.id.hex):
+            response = self.client.post('/api/expenses/', {
+                'group': str(self.group.id),
+                'description': 'Dinner',
+                'amount': '100.00',
+                'paid_by': str(self.user.id),
+                'expense_date': '2024-01-01',
+                'split_data': [{'user_id': user_id, 'amount': '100.00'}],
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_split_user_id_must_be_uuid(self):
+        """Malformed split user ids are reported as a split_data error."""
+        response = self.client.post('/api/expenses/', {
+            'group': str(self.group.id),
+            'description': 'Dinner',
+            'amount': '100.00',
+            'paid_by': str(self.user.id),
+            'expense_date': '2024-01-01',
+            'split_data': [{'user_id': 'not-a-uuid', 'amount': '100.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('split_data', response.data)
+
 
 class SyncAPITests(APITestCase):
     """Tests for sync API endpoints."""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = User.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
             firebase_uid='test_uid',
             email='test@example.com',
             display_name='Test User'
         )
+
+    def setUp(self):
+        self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
     def test_push_sync(self):
@@ -394,4 +620,198 @@ class SyncAPITests(APITestCase):
         pass
 
 
+class RendererTests(APITestCase):
+    """Tests for the orjson response renderer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='render_user', display_name='Render User')
+        cls.group = Group.objects.create(name='Render Group', owner=cls.user)
+        GroupMembership.objects.create(group=cls.group, user=cls.user, role='owner')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_render_index_keyed_errors(self):
+        """List field errors keyed by integer index render as JSON objects."""
+        rendered = ORJSONRenderer().render({'split_data': {0: ['Expected a dictionary of items.']}})
+        self.assertEqual(json.loads(rendered), {'split_data': {'0': ['Expected a dictionary of items.']}})
+
+    def test_nested_list_validation_error_response(self):
+        """A bad item in a list field returns 400 rather than failing to render."""
+        response = self.client.post('/api/expenses/', {
+            'group': str(self.group.id),
+            'description': 'Dinner',
+            'amount': '100.00',
+            'paid_by': str(self.user.id),
+            'expense_date': '2024-01-01',
+            'split_data': ['oops'],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('0', json.loads(response.content)['split_data'])
+
+
+class SyncPushTests(APITestCase):
+    """Tests for per-change handling in sync push."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='push_user', display_name='Push User')
+        cls.group = Group.objects.create(name='Push Group', owner=cls.user)
+        GroupMembership.objects.create(group=cls.group, user=cls.user, role='owner')
+        cls.expense1 = Expense.objects.create(
+            group=cls.group, description='Taxi', amount=Decimal('10.00'),
+            paid_by=cls.user, created_by=cls.user, expense_date='2024-01-01'
+        )
+        cls.expense2 = Expense.objects.create(
+            group=cls.group, description='Snacks', amount=Decimal('10.00'),
+            paid_by=cls.user, created_by=cls.user, expense_date='2024-01-01'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _change(self, entity_id, data, operation='update'):
+        return {
+            'entity_type': 'expense',
+            'operation': operation,
+            'entity_id': str(entity_id),
+            'data': data,
+            'client_timestamp': '2030-01-01T00:00:00Z'
+        }
+
+    def test_failed_change_does_not_roll_back_others(self):
+        """A change that fails in the database is rolled back on its own."""
+        duplicate_splits = [
+            {'user_id': str(self.user.id), 'amount': '5.00'},
+            {'user_id': str(self.user.id), 'amount': '5.00'},
+        ]
+        response = self.client.post('/api/sync/push', {'changes': [
+            self._change(self.expense1.id, {'description': 'Cab'}),
+            self._change(self.expense2.id, {'description': 'Chips', 'splits': duplicate_splits}),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertTrue(results[0]['success'])
+        self.assertFalse(results[1]['success'])
+
+        self.expense1.refresh_from_db()
+        self.expense2.refresh_from_db()
+        self.assertEqual(self.expense1.description, 'Cab')
+        self.assertEqual(self.expense2.description, 'Snacks')
+        self.assertEqual(self.expense2.splits.count(), 0)
+        self.assertEqual(
+            list(SyncLog.objects.order_by('id').values_list('is_resolved', flat=True)),
+            [True, False]
+        )
+
+    def test_update_after_delete_in_same_push_conflicts(self):
+        """An update older than a delete earlier in the batch is reported as a conflict."""
+        # The stored row predates the client's edit, so only the delete makes the server newer
+        Expense.objects.filter(pk=self.expense1.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        client_timestamp = (timezone.now() - timedelta(minutes=5)).isoformat()
+        changes = [
+            self._change(self.expense1.id, {}, operation='delete'),
+            self._change(self.expense1.id, {'description': 'Cab'}),
+        ]
+        for change in changes:
+            change['client_timestamp'] = client_timestamp
+        response = self.client.post('/api/sync/push', {'changes': changes}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertTrue(results[0]['success'])
+        self.assertTrue(results[1].get('conflict'))
+        self.assertFalse(results[1]['success'])
+
+        self.expense1.refresh_from_db()
+        self.assertTrue(self.expense1.is_deleted)
+        self.assertEqual(self.expense1.description, 'Taxi')
+
+    def test_invalid_entity_id_is_reported_per_change(self):
+        """Non-UUID entity ids are rejected by validation without touching the database."""
+        response = self.client.post('/api/sync/push', {'changes': [
+            self._change('local-1', {'group': str(self.group.id), 'amount': '5.00'}, operation='create'),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['results'][0]
+        self.assertFalse(result['success'])
+        self.assertIn('entity_id', result['error'])
+        self.assertEqual(Expense.objects.filter(group=self.group).count(), 2)
+        self.assertFalse(SyncLog.objects.exists())
+
+
+class SyncPullPagingTests(APITestCase):
+    """Tests for keyset paging of expenses in sync pull."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='pull_user', display_name='Pull User')
+        cls.group = Group.objects.create(name='Pull Group', owner=cls.user)
+        GroupMembership.objects.create(group=cls.group, user=cls.user, role='owner')
+        for i in range(7):
+            Expense.objects.create(
+                group=cls.group, description=f'Expense {i}', amount=Decimal('10.00'),
+                paid_by=cls.user, created_by=cls.user, expense_date='2024-01-01'
+            )
+        # Shared timestamps so pages have to break ties on id
+        Expense.objects.filter(group=cls.group).update(updated_at=timezone.now())
+        Settlement.objects.create(
+            group=cls.group, from_user=cls.user, to_user=cls.user,
+            amount=Decimal('5.00'), created_by=cls.user
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _pull(self, **params):
+        response = self.client.get('/api/sync/pull', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_pages_cover_all_expenses_once(self):
+        """Following next_cursor returns every expense exactly once, ending with a null cursor."""
+        pages = [self._pull(limit=3)]
+        while pages[-1]['next_cursor']:
+            pages.append(self._pull(limit=3, cursor=pages[-1]['next_cursor']))
+
+        self.assertEqual([len(page['expenses']) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[-1]['next_cursor'])
+        ids = [expense['id'] for page in pages for expense in page['expenses']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(
+            set(ids),
+            {str(pk) for pk in Expense.objects.filter(group=self.group).values_list('id', flat=True)}
+        )
+
+    def test_cursor_pages_omit_groups_and_settlements(self):
+        """Groups and settlements only come with the first page."""
+        first = self._pull(limit=3)
+        self.assertEqual(len(first['groups']), 1)
+        self.assertEqual(len(first['settlements']), 1)
+
+        second = self._pull(limit=3, cursor=first['next_cursor'])
+        self.assertEqual(second['groups'], [])
+        self.assertEqual(second['settlements'], [])
+
+    def test_unpaged_pull_has_null_cursor(self):
+        """Without limit or cursor every expense is returned in one response."""
+        data = self._pull()
+        self.assertEqual(len(data['expenses']), 7)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_invalid_limit_or_cursor(self):
+        """Bad limit and cursor values are rejected with 400."""
+        for params in ({'limit': 'abc'}, {'limit': '0'}, {'cursor': 'not-a-cursor'}):
+            response = self.client.get('/api/sync/pull', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
 # Run tests with: python manage.py test api
+# Add --keepdb to reuse the test database between runs and --parallel to use all CPUs
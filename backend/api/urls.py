@@ -4,7 +4,7 @@ URL configuration for Chippin API.
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from api.views.auth_views import VerifyTokenView, GuestLoginView, CurrentUserView
+from api.views.auth_views import VerifyTokenView, VerifyTokenBatchView, GuestLoginView, CurrentUserView
 from api.views.group_views import GroupViewSet
 from api.views.expense_views import ExpenseViewSet, SettlementViewSet, CategoryViewSet
 from api.views.sync_views import SyncPushView, SyncPullView
@@ -20,6 +20,7 @@ router.register(r'categories', CategoryViewSet, basename='category')
 urlpatterns = [
     # Auth endpoints
     path('auth/verify', VerifyTokenView.as_view(), name='auth-verify'),
+    path('auth/verify_batch', VerifyTokenBatchView.as_view(), name='auth-verify-batch'),
     path('auth/guest', GuestLoginView.as_view(), name='auth-guest'),
     path('auth/me', CurrentUserView.as_view(), name='auth-me'),
 
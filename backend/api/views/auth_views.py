@@ -1,13 +1,29 @@
 """
 Authentication views for Chippin API.
 """
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.throttling import ScopedRateThrottle
+from api.authentication import verify_firebase_token
 from api.serializers import UserSerializer
 from api.models import User
 
+logger = logging.getLogger(__name__)
+
+# Limits for VerifyTokenBatchView
+VERIFY_BATCH_MAX_TOKENS = 100
+VERIFY_BATCH_MAX_WORKERS = 16
+
+# Shared by every batch request so concurrent callers can't multiply the thread count
+_verify_executor = ThreadPoolExecutor(
+    max_workers=VERIFY_BATCH_MAX_WORKERS, thread_name_prefix='verify-batch'
+)
+
 
 class VerifyTokenView(APIView):
     """
@@ -26,9 +42,6 @@ class VerifyTokenView(APIView):
             "display_name": "optional_display_name"
         }
         """
-        from api.authentication import get_firebase_app
-        from firebase_admin import auth as firebase_auth
-
         token = request.data.get('token')
         if not token:
             return Response(
@@ -37,9 +50,8 @@ class VerifyTokenView(APIView):
             )
 
         try:
-            # Verify the Firebase token
-            get_firebase_app()
-            decoded_token = firebase_auth.verify_id_token(token)
+            # Verify the Firebase token (recent verifications are cached)
+            decoded_token = verify_firebase_token(token)
             uid = decoded_token.get('uid')
 
             if not uid:
@@ -50,9 +62,9 @@ class VerifyTokenView(APIView):
 
             # Get or create user
             user, created = User.objects.get_or_create(
-                firebase_uid=uid,
+                username=uid,
                 defaults={
-                    'username': uid,
+                    'firebase_uid': uid,
                     'email': decoded_token.get('email', ''),
                     'display_name': request.data.get('display_name') or decoded_token.get('name', ''),
                 }
@@ -64,11 +76,12 @@ class VerifyTokenView(APIView):
                 if decoded_token.get('email') and user.email != decoded_token['email']:
                     user.email = decoded_token['email']
                     update_fields.append('email')
-                if request.data.get('display_name'):
-                    user.display_name = request.data['display_name']
+                display_name = request.data.get('display_name')
+                if display_name and user.display_name != display_name:
+                    user.display_name = display_name
                     update_fields.append('display_name')
                 if update_fields:
-                    user.save(update_fields=update_fields)
+                    user.save(update_fields=update_fields + ['updated_at'])
 
             serializer = UserSerializer(user)
             return Response({
@@ -83,6 +96,53 @@ class VerifyTokenView(APIView):
             )
 
 
+class VerifyTokenBatchView(APIView):
+    """
+    Verify several Firebase tokens in one request.
+    Used by sync clients that reconnect holding tokens for more than one account.
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'verify_batch'
+
+    def post(self, request):
+        """
+        Verify a list of Firebase ID tokens.
+
+        Request body:
+        {
+            "tokens": ["firebase_id_token", ...]
+        }
+        """
+        tokens = request.data.get('tokens')
+        if not isinstance(tokens, list) or not tokens:
+            return Response(
+                {'error': 'tokens must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(tokens) > VERIFY_BATCH_MAX_TOKENS:
+            return Response(
+                {'error': f'At most {VERIFY_BATCH_MAX_TOKENS} tokens per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Signature checks run in native code, so a thread pool overlaps them
+        results = list(_verify_executor.map(self._verify, tokens))
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _verify(token):
+        """Verify one token and return its result entry."""
+        try:
+            decoded_token = verify_firebase_token(token)
+        except Exception as e:
+            # Keep firebase's reason out of the unauthenticated response
+            logger.info('Batch token verification failed: %s', e)
+            return {'valid': False, 'uid': None, 'error': 'Invalid token'}
+        return {'valid': True, 'uid': decoded_token.get('uid'), 'error': None}
+
+
 class GuestLoginView(APIView):
     """
     Create a guest user account for offline-first usage.
@@ -99,8 +159,6 @@ class GuestLoginView(APIView):
             "display_name": "optional_name"
         }
         """
-        import uuid
-
         device_id = request.data.get('device_id')
         if not device_id:
             return Response(
@@ -108,9 +166,11 @@ class GuestLoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create or get guest user
+        # Create or get guest user. Returning guests cost a single indexed SELECT on
+        # the unique username; a concurrent first login falls back to that SELECT
+        # when its INSERT hits the unique constraint.
         guest_username = f"guest_{device_id[:32]}"
-        user, created = User.objects.get_or_create(
+        user, created = User.objects.only(*UserSerializer.Meta.fields).get_or_create(
             username=guest_username,
             defaults={
                 'display_name': request.data.get('display_name', 'Guest User'),
@@ -1,17 +1,29 @@
 """
 Expense views for Chippin API.
 """
+import hashlib
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Prefetch, Q, Sum
+from django.db.models.functions import Cast, Round, TruncMonth
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.utils import timezone
 
-from api.models import Expense, ExpenseSplit, Group, Settlement, Category
+from api.models import Expense, ExpenseSplit, Settlement, Category, get_preset_categories
 from api.serializers import (
     ExpenseSerializer, ExpenseListSerializer, SettlementSerializer, CategorySerializer
 )
-from api.permissions import IsGroupMember, IsExpenseOwner
+from api.permissions import IsGroupMember, IsExpenseOwner, get_group_role, get_user_group_ids
+from api.renderers import ORJSONRenderer
+
+
+# Preset categories never change at runtime, so their JSON body and ETag are built once
+PRESETS_JSON = ORJSONRenderer().render(list(get_preset_categories()))
+PRESETS_ETAG = '"%s"' % hashlib.blake2b(PRESETS_JSON, digest_size=16).hexdigest()
 
 
 class ExpenseViewSet(viewsets.ModelViewSet):
@@ -20,13 +32,31 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     """
     serializer_class = ExpenseSerializer
 
+    # Columns read by ExpenseListSerializer
+    list_only_fields = (
+        'id', 'description', 'amount', 'currency', 'expense_date', 'is_settled', 'created_at',
+        'paid_by_id', 'paid_by__display_name', 'category_id', 'category__icon',
+    )
+
     def get_queryset(self):
         """Return expenses for groups where user is a member."""
-        user_groups = Group.objects.filter(members=self.request.user)
         queryset = Expense.objects.filter(
-            group__in=user_groups,
+            group_id__in=get_user_group_ids(self.request),
             is_deleted=False
-        ).select_related('paid_by', 'created_by', 'category', 'group').prefetch_related('splits')
+        )
+
+        if self.action == 'list':
+            # Explicit ordering matching expense_group_date_idx, with id as a stable tiebreaker
+            queryset = queryset.select_related('paid_by', 'category').only(
+                *self.list_only_fields
+            ).order_by('-expense_date', '-created_at', '-id')
+        else:
+            queryset = queryset.select_related('paid_by', 'created_by', 'category', 'group').prefetch_related(
+                Prefetch('splits', queryset=ExpenseSplit.objects.select_related('user').only(
+                    'id', 'expense_id', 'user_id', 'amount', 'percentage', 'shares', 'is_settled',
+                    'user__id', 'user__display_name', 'user__avatar_url'
+                ))
+            )
 
         # Filter by group if specified
         group_id = self.request.query_params.get('group')
@@ -70,8 +100,7 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         # Verify user is member of the group
         group_id = request.data.get('group')
         if group_id:
-            group = get_object_or_404(Group, id=group_id)
-            if not group.members.filter(id=request.user.id).exists():
+            if get_group_role(request, group_id) is None:
                 return Response(
                     {'error': 'You are not a member of this group'},
                     status=status.HTTP_403_FORBIDDEN
@@ -79,22 +108,38 @@ class ExpenseViewSet(viewsets.ModelViewSet):
 
         return super().create(request, *args, **kwargs)
 
+    def _filter_pk(self, queryset, pk):
+        """Filter a queryset by primary key, returning an empty one for malformed ids."""
+        try:
+            return queryset.filter(pk=pk)
+        except (TypeError, ValueError, ValidationError):
+            return queryset.none()
+
     def destroy(self, request, *args, **kwargs):
         """Soft delete an expense."""
-        expense = self.get_object()
-        expense.is_deleted = True
-        expense.save(update_fields=['is_deleted', 'updated_at'])
+        # Same rule as IsExpenseOwner, applied in the UPDATE itself
+        updated = self._filter_pk(self.get_queryset(), kwargs['pk']).filter(
+            Q(created_by_id=request.user.id) | Q(group__owner_id=request.user.id)
+        ).update(is_deleted=True, updated_at=timezone.now())
+
+        if not updated:
+            # Nothing matched: let get_object() raise the appropriate 404/403
+            self.get_object()
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'])
     def settle(self, request, pk=None):
         """Mark an expense as settled."""
-        expense = self.get_object()
-        expense.is_settled = True
-        expense.save(update_fields=['is_settled', 'updated_at'])
+        now = timezone.now()
+        with transaction.atomic():
+            updated = self._filter_pk(self.get_queryset(), pk).update(is_settled=True, updated_at=now)
+            if not updated:
+                return Response(status=status.HTTP_404_NOT_FOUND)
 
-        # Mark all splits as settled
-        expense.splits.update(is_settled=True, settled_at=timezone.now())
+            # Mark all splits as settled
+            ExpenseSplit.objects.filter(expense_id=pk).update(is_settled=True, settled_at=now)
 
         return Response({'message': 'Expense marked as settled'})
 
@@ -110,29 +155,23 @@ class ExpenseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        group = get_object_or_404(Group, id=group_id)
-        if not group.members.filter(id=request.user.id).exists():
+        if get_group_role(request, group_id) is None:
             return Response(
                 {'error': 'You are not a member of this group'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        expenses = Expense.objects.filter(group=group, is_deleted=False)
+        expenses = Expense.objects.filter(group_id=group_id, is_deleted=False)
 
         # Calculate totals
-        from django.db.models import Sum, Count
-        from django.db.models.functions import TruncMonth
-
-        total = expenses.aggregate(
-            total_amount=Sum('amount'),
-            total_count=Count('id')
-        )
+        # Sums are cast to float in the database so rows can be returned as-is
+        total = Cast(Round(Sum('amount'), 2), output_field=FloatField())
 
         # Category breakdown
         category_breakdown = expenses.values(
             'category__name', 'category__icon'
         ).annotate(
-            total=Sum('amount'),
+            total=total,
             count=Count('id')
         ).order_by('-total')
 
@@ -140,40 +179,41 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         monthly_breakdown = expenses.annotate(
             month=TruncMonth('expense_date')
         ).values('month').annotate(
-            total=Sum('amount'),
+            total=total,
             count=Count('id')
         ).order_by('-month')[:12]
 
         # User breakdown (who paid most)
-        user_breakdown = expenses.values(
-            'paid_by__id', 'paid_by__display_name'
+        user_breakdown = list(expenses.values(
+            user_id=F('paid_by_id'),
+            display_name=F('paid_by__display_name')
         ).annotate(
-            total=Sum('amount'),
+            total=total,
             count=Count('id')
-        ).order_by('-total')
+        ).order_by('-total'))
+
+        # Every expense has a payer, so the user breakdown also yields the totals
+        total_amount = round(sum(item['total'] for item in user_breakdown), 2)
+        total_count = sum(item['count'] for item in user_breakdown)
+
+        # Stream one JSON section at a time so only one breakdown is held in memory
+        return StreamingHttpResponse(
+            self._stream_summary(total_amount, total_count, [
+                ('by_category', category_breakdown.iterator(chunk_size=500)),
+                ('by_month', monthly_breakdown.iterator(chunk_size=500)),
+                ('by_user', user_breakdown),
+            ]),
+            content_type='application/json'
+        )
 
-        return Response({
-            'total_amount': float(total['total_amount'] or 0),
-            'total_count': total['total_count'] or 0,
-            'by_category': list(category_breakdown),
-            'by_month': [
-                {
-                    'month': item['month'].isoformat() if item['month'] else None,
-                    'total': float(item['total']),
-                    'count': item['count']
-                }
-                for item in monthly_breakdown
-            ],
-            'by_user': [
-                {
-                    'user_id': str(item['paid_by__id']),
-                    'display_name': item['paid_by__display_name'],
-                    'total': float(item['total']),
-                    'count': item['count']
-                }
-                for item in user_breakdown
-            ]
-        })
+    @staticmethod
+    def _stream_summary(total_amount, total_count, sections):
+        """Yield the summary JSON object, one breakdown list per chunk."""
+        render = ORJSONRenderer().render
+        yield b'{"total_amount":%s,"total_count":%s' % (render(total_amount), render(total_count))
+        for key, rows in sections:
+            yield b',"%s":[%s]' % (key.encode(), b','.join(render(row) for row in rows))
+        yield b'}'
 
 
 class SettlementViewSet(viewsets.ModelViewSet):
@@ -184,9 +224,8 @@ class SettlementViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return settlements for groups where user is a member."""
-        user_groups = Group.objects.filter(members=self.request.user)
         queryset = Settlement.objects.filter(
-            group__in=user_groups
+            group_id__in=get_user_group_ids(self.request)
         ).select_related('from_user', 'to_user', 'created_by', 'group')
 
         # Filter by group if specified
@@ -200,8 +239,7 @@ class SettlementViewSet(viewsets.ModelViewSet):
         """Create a new settlement."""
         group_id = request.data.get('group')
         if group_id:
-            group = get_object_or_404(Group, id=group_id)
-            if not group.members.filter(id=request.user.id).exists():
+            if get_group_role(request, group_id) is None:
                 return Response(
                     {'error': 'You are not a member of this group'},
                     status=status.HTTP_403_FORBIDDEN
@@ -221,30 +259,32 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return preset categories and custom categories for user's groups."""
-        user_groups = Group.objects.filter(members=self.request.user)
         return Category.objects.filter(
-            models.Q(is_preset=True) |
-            models.Q(group__in=user_groups)
+            Q(is_preset=True) |
+            Q(group_id__in=get_user_group_ids(self.request))
         )
 
     def list(self, request, *args, **kwargs):
-        """List all categories including presets."""
+        """
+        List all categories including presets.
+        With ?presets_only=1 only the presets are returned, with an ETag for conditional GETs.
+        """
+        if request.query_params.get('presets_only'):
+            if PRESETS_ETAG in request.META.get('HTTP_IF_NONE_MATCH', ''):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(PRESETS_JSON, content_type='application/json')
+            response['ETag'] = PRESETS_ETAG
+            return response
+
         # Get predefined categories
-        presets = [
-            {'id': cat[0], 'name': cat[1], 'icon': cat[2], 'is_preset': True}
-            for cat in Category.PRESET_CATEGORIES
-        ]
+        presets = list(get_preset_categories())
 
         # Get custom categories
-        user_groups = Group.objects.filter(members=request.user)
-        custom = Category.objects.filter(group__in=user_groups)
+        custom = Category.objects.filter(group_id__in=get_user_group_ids(request))
         custom_serialized = CategorySerializer(custom, many=True).data
 
         return Response({
             'presets': presets,
             'custom': custom_serialized
         })
-
-
-# Import models for the Q object
-from django.db import models
@@ -1,12 +1,20 @@
 """
 Group views for Chippin API.
 """
+import hashlib
+from collections import defaultdict
+from decimal import Decimal
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Prefetch, Sum
 from django.shortcuts import get_object_or_404
 
-from api.models import Group, GroupMembership, User
+from api.models import Expense, ExpenseSplit, Group, GroupMembership, Settlement, User
 from api.serializers import (
     GroupSerializer, GroupListSerializer, GroupCreateSerializer,
     JoinGroupSerializer, GroupMembershipSerializer, BalanceSerializer
@@ -20,12 +28,29 @@ class GroupViewSet(viewsets.ModelViewSet):
     """
     serializer_class = GroupSerializer
 
+    # Columns read by GroupListSerializer
+    list_only_fields = ('id', 'name', 'currency', 'image_url', 'updated_at')
+
+    # Detail actions that never serialize the group itself
+    bare_actions = ('members', 'balances', 'leave', 'remove_member', 'regenerate_invite', 'destroy')
+
     def get_queryset(self):
         """Return groups where user is a member."""
-        return Group.objects.filter(
+        queryset = Group.objects.filter(
             members=self.request.user,
             is_active=True
-        ).prefetch_related('members', 'groupmembership_set')
+        )
+
+        if self.action == 'list':
+            return queryset.with_member_count().only(*self.list_only_fields)
+        if self.action in self.bare_actions:
+            return queryset
+
+        return queryset.with_stats().select_related('owner').prefetch_related(
+            Prefetch('groupmembership_set', queryset=GroupMembership.objects.select_related('user').only(
+                'id', 'group_id', 'role', 'joined_at', 'user__id', 'user__display_name', 'user__avatar_url'
+            ))
+        )
 
     def get_serializer_class(self):
         """Use different serializers for different actions."""
@@ -37,10 +62,11 @@ class GroupViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         """Set permissions based on action."""
-        if self.action in ['update', 'partial_update', 'destroy']:
-            return [IsGroupOwnerOrAdmin()]
+        # Object-level checks need an authenticated user, so keep IsAuthenticated in front
+        if self.action in ['update', 'partial_update', 'destroy', 'remove_member', 'regenerate_invite']:
+            return [IsAuthenticated(), IsGroupOwnerOrAdmin()]
         if self.action in ['retrieve', 'members', 'balances']:
-            return [IsGroupMember()]
+            return [IsAuthenticated(), IsGroupMember()]
         return super().get_permissions()
 
     def create(self, request, *args, **kwargs):
@@ -50,6 +76,7 @@ class GroupViewSet(viewsets.ModelViewSet):
         group = serializer.save()
         
         # Return full group details
+        group = self.get_queryset().get(pk=group.pk)
         response_serializer = GroupSerializer(group)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
@@ -67,6 +94,7 @@ class GroupViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         group = serializer.save()
         
+        group = self.get_queryset().get(pk=group.pk)
         response_serializer = GroupSerializer(group)
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
@@ -84,21 +112,19 @@ class GroupViewSet(viewsets.ModelViewSet):
         group = self.get_object()
 
         # Owner cannot leave
-        if group.owner == request.user:
+        if group.owner_id == request.user.id:
             return Response(
                 {'error': 'Owner cannot leave the group. Transfer ownership first.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            membership = GroupMembership.objects.get(user=request.user, group=group)
-            membership.delete()
-            return Response({'message': 'Left group successfully'})
-        except GroupMembership.DoesNotExist:
+        deleted, _ = GroupMembership.objects.filter(user=request.user, group=group).delete()
+        if not deleted:
             return Response(
                 {'error': 'Not a member of this group'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return Response({'message': 'Left group successfully'})
 
     @action(detail=True, methods=['post'])
     def remove_member(self, request, pk=None):
@@ -112,29 +138,20 @@ class GroupViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check permission
-        if not IsGroupOwnerOrAdmin().has_object_permission(request, self, group):
-            return Response(
-                {'error': 'Only owner or admin can remove members'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         # Cannot remove owner
-        if str(group.owner.id) == user_id:
+        if str(group.owner_id) == str(user_id):
             return Response(
                 {'error': 'Cannot remove the group owner'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            membership = GroupMembership.objects.get(user_id=user_id, group=group)
-            membership.delete()
-            return Response({'message': 'Member removed successfully'})
-        except GroupMembership.DoesNotExist:
+        deleted, _ = GroupMembership.objects.filter(user_id=user_id, group=group).delete()
+        if not deleted:
             return Response(
                 {'error': 'User is not a member of this group'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return Response({'message': 'Member removed successfully'})
 
     @action(detail=True, methods=['get'])
     def balances(self, request, pk=None):
@@ -143,57 +160,75 @@ class GroupViewSet(viewsets.ModelViewSet):
         Shows who owes whom and net amounts.
         """
         group = self.get_object()
-        balances = self._calculate_balances(group)
-        return Response(balances)
+        return Response(self._calculate_balances(group))
+
+    def _expense_totals(self, group):
+        """
+        Return (paid, owes) maps of user id to unsettled expense totals.
+        These scans are the expensive part of the balances, so they are cached
+        under a version of the group's expenses and splits:
+        - expense count and latest updated_at, which expense saves and the
+          views' queryset updates (delete, settle, sync) all move;
+        - split count and amount total, which catch bulk split edits.
+        Saving or deleting a single split touches its expense (see
+        ExpenseSplit.save), so reassigning a split's user is covered too.
+        Settlements and members are always read fresh.
+        """
+        version = (
+            Expense.objects.filter(group=group).aggregate(latest=Max('updated_at'), count=Count('id')),
+            ExpenseSplit.objects.filter(expense__group=group).aggregate(count=Count('id'), total=Sum('amount')),
+        )
+        digest = hashlib.blake2b(repr(version).encode(), digest_size=16)
+        key = f'group_expense_totals:{group.id}:{digest.hexdigest()}'
+        totals = cache.get(key)
+        if totals is not None:
+            return totals
+
+        # Totals are summed in the database and read back as (user_id, total) rows
+        unsettled = {'is_deleted': False, 'is_settled': False}
+        paid_rows = Expense.objects.filter(
+            group=group, **unsettled
+        ).values_list('paid_by_id').annotate(total=Sum('amount')).order_by()
+        owed_rows = ExpenseSplit.objects.filter(
+            expense__group=group, **{f'expense__{key}': value for key, value in unsettled.items()}
+        ).values_list('user_id').annotate(total=Sum('amount')).order_by()
+
+        totals = dict(paid_rows), dict(owed_rows)
+        cache.set(key, totals, settings.BALANCES_CACHE_TTL)
+        return totals
 
     def _calculate_balances(self, group):
         """Calculate balances for all group members."""
-        from decimal import Decimal
-        from collections import defaultdict
-        from api.models import Expense, ExpenseSplit, Settlement
-
-        # Get all expenses and splits
-        expenses = Expense.objects.filter(
-            group=group,
-            is_deleted=False,
-            is_settled=False
-        ).prefetch_related('splits')
+        paid_totals, owed_totals = self._expense_totals(group)
 
-        # Get all settlements
-        settlements = Settlement.objects.filter(group=group)
+        # Settlements are summed per (payer, payee) pair
+        settlement_rows = Settlement.objects.filter(
+            group=group
+        ).values_list('from_user_id', 'to_user_id').annotate(total=Sum('amount')).order_by()
 
         # Calculate what each person has paid and owes
-        paid = defaultdict(Decimal)
-        owes = defaultdict(Decimal)
-
-        for expense in expenses:
-            paid[str(expense.paid_by_id)] += expense.amount
-            for split in expense.splits.all():
-                owes[str(split.user_id)] += split.amount
+        paid = defaultdict(Decimal, paid_totals)
+        owes = defaultdict(Decimal, owed_totals)
 
         # Apply settlements
-        for settlement in settlements:
-            paid[str(settlement.from_user_id)] += settlement.amount
-            owes[str(settlement.from_user_id)] -= settlement.amount
-            paid[str(settlement.to_user_id)] -= settlement.amount
-            owes[str(settlement.to_user_id)] += settlement.amount
-
-        # Calculate net balance for each member
-        members = group.members.all()
+        for from_user_id, to_user_id, total in settlement_rows:
+            paid[from_user_id] += total
+            owes[from_user_id] -= total
+            paid[to_user_id] -= total
+            owes[to_user_id] += total
+
+        # Calculate net balance for each member (UUIDs are stringified by the renderer)
+        # Only the columns returned in the response are read, as plain dicts
+        members = group.members.values('id', 'display_name', 'avatar_url')
         result = []
 
         for member in members:
-            member_id = str(member.id)
-            net_paid = paid.get(member_id, Decimal(0))
-            net_owed = owes.get(member_id, Decimal(0))
+            net_paid = paid[member['id']]
+            net_owed = owes[member['id']]
             balance = net_paid - net_owed
 
             result.append({
-                'user': {
-                    'id': member_id,
-                    'display_name': member.display_name,
-                    'avatar_url': member.avatar_url
-                },
+                'user': member,
                 'paid': float(net_paid),
                 'owes': float(net_owed),
                 'balance': float(balance)  # Positive = owed money, Negative = owes money
@@ -213,51 +248,38 @@ class GroupViewSet(viewsets.ModelViewSet):
     def _simplify_debts(self, balances):
         """
         Simplify debts to minimize transactions.
-        Uses greedy algorithm to match creditors and debtors.
+        Expects balances sorted ascending, so debtors are walked from the front
+        and creditors from the back in a single pass.
         """
-        from decimal import Decimal
-
-        debtors = []  # People who owe money (negative balance)
-        creditors = []  # People who are owed money (positive balance)
-
-        for b in balances:
-            if b['balance'] < -0.01:
-                debtors.append({
-                    'user': b['user'],
-                    'amount': abs(b['balance'])
-                })
-            elif b['balance'] > 0.01:
-                creditors.append({
-                    'user': b['user'],
-                    'amount': b['balance']
-                })
-
-        # Sort for greedy matching
-        debtors.sort(key=lambda x: x['amount'], reverse=True)
-        creditors.sort(key=lambda x: x['amount'], reverse=True)
-
         transactions = []
-        i, j = 0, 0
+        if not balances:
+            return transactions
 
-        while i < len(debtors) and j < len(creditors):
-            debtor = debtors[i]
-            creditor = creditors[j]
+        i, j = 0, len(balances) - 1
+        debt = -balances[i]['balance']  # Left to pay by the current debtor
+        credit = balances[j]['balance']  # Left to receive by the current creditor
 
-            amount = min(debtor['amount'], creditor['amount'])
+        while i < j:
+            # Move past anyone settled to within a cent
+            if debt < 0.01:
+                i += 1
+                debt = -balances[i]['balance']
+                continue
+            if credit < 0.01:
+                j -= 1
+                credit = balances[j]['balance']
+                continue
+
+            amount = min(debt, credit)
             if amount > 0.01:
                 transactions.append({
-                    'from_user': debtor['user'],
-                    'to_user': creditor['user'],
+                    'from_user': balances[i]['user'],
+                    'to_user': balances[j]['user'],
                     'amount': round(amount, 2)
                 })
 
-            debtor['amount'] -= amount
-            creditor['amount'] -= amount
-
-            if debtor['amount'] < 0.01:
-                i += 1
-            if creditor['amount'] < 0.01:
-                j += 1
+            debt -= amount
+            credit -= amount
 
         return transactions
 
@@ -266,12 +288,6 @@ class GroupViewSet(viewsets.ModelViewSet):
         """Regenerate invite code for a group."""
         group = self.get_object()
 
-        if not IsGroupOwnerOrAdmin().has_object_permission(request, self, group):
-            return Response(
-                {'error': 'Only owner or admin can regenerate invite code'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         group.invite_code = group._generate_invite_code()
         group.save(update_fields=['invite_code'])
 
@@ -2,25 +2,43 @@
 Sync views for Chippin API.
 Handles offline-first sync operations.
 """
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.db import transaction
-from datetime import datetime
-
-from api.models import Expense, ExpenseSplit, Group, Settlement, SyncLog
+from django.db.models import Prefetch, Q
+from django.http import StreamingHttpResponse
+from itertools import islice
+import base64
+import binascii
+import uuid
+
+from api.models import Expense, ExpenseSplit, Group, GroupMembership, Settlement, SyncLog
+from api.permissions import get_user_group_ids
+from api.renderers import ORJSONRenderer
 from api.serializers import (
-    ExpenseSerializer, GroupSerializer, SettlementSerializer,
+    ExpenseSerializer, GroupSerializer, MinimalSyncResponseSerializer, SettlementSerializer,
     SyncPushSerializer, SyncPullSerializer
 )
 
 
+def _parse_uuid(value):
+    """Return value as a UUID, or None if it is not one."""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
 class SyncPushView(APIView):
     """
     Push local changes to the server.
     Handles conflict resolution.
     """
+    # Full expense payloads in results are only built when the client asks (?verbose=1)
+    verbose = False
 
     def post(self, request):
         """
@@ -39,38 +57,182 @@ class SyncPushView(APIView):
                 }
             ]
         }
+
+        Query params:
+        - verbose: return full expense data instead of only version fields
         """
+        self.verbose = request.query_params.get('verbose', '').lower() in ('1', 'true')
         changes = request.data.get('changes', [])
         if not changes:
             return Response({'error': 'No changes provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = []
-        conflicts = []
+        results = [None] * len(changes)
+        expense_creates = []
+        other_changes = []
+        logs = []
+
+        # Validate every change with one serializer instance, then group them
+        validator = SyncPushSerializer()
+        for index, change in enumerate(changes):
+            try:
+                change_data = validator.run_validation(change)
+            except serializers.ValidationError as e:
+                results[index] = {
+                    'local_id': change.get('local_id') or change.get('entity_id'),
+                    'success': False,
+                    'error': e.detail
+                }
+                continue
+
+            # New expenses only carry client-side ids, so nothing else in the
+            # batch can reference them and they can be inserted together.
+            if change_data['entity_type'] == 'expense' and change_data['operation'] == 'create':
+                expense_creates.append((index, change_data))
+            else:
+                other_changes.append((index, change_data))
+
+        # Load every expense the batch updates in one query (deletes are a single UPDATE)
+        expense_ids = {
+            _parse_uuid(change_data['entity_id'])
+            for _, change_data in other_changes
+            if change_data['entity_type'] == 'expense' and change_data['operation'] == 'update'
+        }
+        expense_ids.discard(None)
+        existing_expenses = self._expense_queryset().in_bulk(expense_ids) if expense_ids else {}
 
         with transaction.atomic():
-            for change in changes:
-                serializer = SyncPushSerializer(data=change)
-                if not serializer.is_valid():
-                    results.append({
-                        'local_id': change.get('local_id') or change.get('entity_id'),
-                        'success': False,
-                        'error': serializer.errors
-                    })
-                    continue
-
-                result = self._process_change(request.user, serializer.validated_data)
-                if result.get('conflict'):
-                    conflicts.append(result)
-                results.append(result)
+            for index, change_data in other_changes:
+                results[index] = self._process_change(request.user, change_data, logs, existing_expenses)
+
+            for index, result in self._bulk_create_expenses(request.user, expense_creates, logs):
+                results[index] = result
+
+            # Written in the same transaction, so logs never outlive a rolled-back push
+            SyncLog.objects.bulk_create(logs, batch_size=500)
 
         return Response({
             'results': results,
-            'conflicts': conflicts,
+            'conflicts': [result for result in results if result.get('conflict')],
             'server_timestamp': timezone.now().isoformat()
         })
 
-    def _process_change(self, user, change_data):
-        """Process a single change and handle conflicts."""
+    def _bulk_create_expenses(self, user, creates, logs):
+        """
+        Create a batch of synced expenses with one INSERT for the expenses and
+        one for their splits. Falls back to per-change processing if the batch
+        fails so a single bad change does not reject the others.
+        """
+        if not creates:
+            return []
+
+        group_ids = {_parse_uuid(change_data['data'].get('group')) for _, change_data in creates}
+        group_ids.discard(None)
+        accessible_groups = set(
+            GroupMembership.objects.filter(
+                group_id__in=group_ids, user=user
+            ).values_list('group_id', flat=True)
+        )
+
+        results = []
+        created = []
+        expenses = []
+        splits = []
+        for index, change_data in creates:
+            entity_id = change_data['entity_id']
+            local_id = change_data.get('local_id')
+            data = change_data['data']
+            result = {
+                'local_id': local_id or entity_id,
+                'entity_type': 'expense',
+                'operation': 'create',
+                'success': False
+            }
+
+            group_id = _parse_uuid(data.get('group'))
+            if group_id not in accessible_groups:
+                result['error'] = 'Group not found or access denied'
+                results.append((index, result))
+                logs.append(self._build_sync_log(user, change_data, success=False))
+                continue
+
+            expense, expense_splits = self._build_expense(user, group_id, local_id, data)
+            expenses.append(expense)
+            splits.extend(expense_splits)
+            created.append((index, change_data, result, expense))
+
+        try:
+            with transaction.atomic():
+                Expense.objects.bulk_create(expenses, batch_size=1000)
+                ExpenseSplit.objects.bulk_create(splits, batch_size=1000)
+        except Exception:
+            # _process_change uses a savepoint per change, so one failed INSERT doesn't break the rest
+            for index, change_data, _, _ in created:
+                results.append((index, self._process_change(user, change_data, logs)))
+            return results
+
+        saved = {}
+        if self.verbose:
+            saved = Expense.objects.filter(id__in=[expense.id for expense in expenses]).select_related(
+                'paid_by', 'created_by', 'category'
+            ).prefetch_related(
+                Prefetch('splits', queryset=ExpenseSplit.objects.select_related('user'))
+            ).in_bulk()
+        for index, change_data, result, expense in created:
+            result['success'] = True
+            result['server_id'] = str(expense.id)
+            result['data'] = self._expense_data(saved.get(expense.id, expense))
+            results.append((index, result))
+            logs.append(self._build_sync_log(user, change_data, success=True))
+
+        return results
+
+    def _build_expense(self, user, group_id, local_id, data):
+        """Build an unsaved synced expense and its splits."""
+        expense = Expense(
+            group_id=group_id,
+            description=data.get('description', ''),
+            amount=data.get('amount'),
+            currency=data.get('currency', 'INR'),
+            paid_by_id=data.get('paid_by'),
+            split_type=data.get('split_type', 'equal'),
+            expense_date=data.get('expense_date', timezone.now().date()),
+            notes=data.get('notes', ''),
+            created_by=user,
+            local_id=local_id,
+            last_synced_at=timezone.now()
+        )
+        return expense, self._build_splits(expense, data.get('splits', []))
+
+    def _build_splits(self, expense, splits):
+        """Build unsaved splits for a synced expense."""
+        return [
+            ExpenseSplit(
+                expense=expense,
+                user_id=split.get('user_id'),
+                amount=split.get('amount'),
+                percentage=split.get('percentage'),
+                shares=split.get('shares', 1)
+            )
+            for split in splits
+        ]
+
+    def _build_sync_log(self, user, change_data, success):
+        """Build an unsaved SyncLog entry for a processed change."""
+        return SyncLog(
+            user=user,
+            entity_type=SyncLog.ENTITY_TYPE_IDS[change_data['entity_type']],
+            entity_id=change_data['entity_id'],
+            operation=SyncLog.OPERATION_IDS[change_data['operation']],
+            data=change_data['data'],
+            client_timestamp=change_data['client_timestamp'],
+            is_resolved=success
+        )
+
+    def _process_change(self, user, change_data, logs, existing_expenses=None):
+        """
+        Process a single change and handle conflicts.
+        existing_expenses maps ids to expenses the caller already loaded.
+        """
         entity_type = change_data['entity_type']
         operation = change_data['operation']
         entity_id = change_data['entity_id']
@@ -86,73 +248,86 @@ class SyncPushView(APIView):
         }
 
         try:
-            if entity_type == 'expense':
-                result = self._sync_expense(user, operation, entity_id, local_id, data, client_timestamp, result)
-            elif entity_type == 'group':
-                result = self._sync_group(user, operation, entity_id, local_id, data, client_timestamp, result)
-            elif entity_type == 'settlement':
-                result = self._sync_settlement(user, operation, entity_id, local_id, data, client_timestamp, result)
-            else:
-                result['error'] = f'Unknown entity type: {entity_type}'
+            # Savepoint per change: a failed write rolls back only this change
+            # and leaves the outer transaction usable for the rest of the batch
+            with transaction.atomic():
+                if entity_type == 'expense':
+                    result = self._sync_expense(
+                        user, operation, entity_id, local_id, data, client_timestamp, result, existing_expenses
+                    )
+                elif entity_type == 'group':
+                    result = self._sync_group(user, operation, entity_id, local_id, data, client_timestamp, result)
+                elif entity_type == 'settlement':
+                    result = self._sync_settlement(
+                        user, operation, entity_id, local_id, data, client_timestamp, result
+                    )
+                else:
+                    result['error'] = f'Unknown entity type: {entity_type}'
 
         except Exception as e:
+            result['success'] = False
+            result.pop('server_id', None)
+            result.pop('data', None)
             result['error'] = str(e)
 
+            # A preloaded expense may hold the rolled-back edits; reload it for later changes
+            if entity_type == 'expense' and existing_expenses:
+                expense = existing_expenses.get(_parse_uuid(entity_id))
+                if expense is not None:
+                    expense.refresh_from_db()
+
         # Log sync operation
-        SyncLog.objects.create(
-            user=user,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            operation=operation,
-            data=data,
-            client_timestamp=client_timestamp,
-            is_resolved=result['success']
-        )
+        logs.append(self._build_sync_log(user, change_data, success=result['success']))
 
         return result
 
-    def _sync_expense(self, user, operation, entity_id, local_id, data, client_timestamp, result):
+    def _expense_data(self, expense):
+        """Serialize a pushed expense for its result entry."""
+        if self.verbose:
+            return ExpenseSerializer(expense).data
+        return MinimalSyncResponseSerializer(expense).data
+
+    def _is_member(self, user, group_id):
+        """Check group access against the membership table alone."""
+        return group_id is not None and GroupMembership.objects.filter(
+            group_id=group_id, user=user
+        ).exists()
+
+    def _expense_queryset(self):
+        """Expenses with the relations used by permission checks and ExpenseSerializer."""
+        return Expense.objects.select_related('group', 'created_by', 'paid_by', 'category')
+
+    def _get_expense(self, entity_id, existing_expenses):
+        """Return a synced expense from the preloaded batch, or load it."""
+        if existing_expenses is None:
+            return self._expense_queryset().get(id=entity_id)
+        expense = existing_expenses.get(_parse_uuid(entity_id))
+        if expense is None:
+            raise Expense.DoesNotExist
+        return expense
+
+    def _sync_expense(self, user, operation, entity_id, local_id, data, client_timestamp, result,
+                      existing_expenses=None):
         """Sync an expense."""
         if operation == 'create':
             # Check user has access to group
-            group = Group.objects.filter(id=data.get('group'), members=user).first()
-            if not group:
+            group_id = _parse_uuid(data.get('group'))
+            if not self._is_member(user, group_id):
                 result['error'] = 'Group not found or access denied'
                 return result
 
-            # Create expense
-            expense = Expense.objects.create(
-                group=group,
-                description=data.get('description', ''),
-                amount=data.get('amount'),
-                currency=data.get('currency', 'INR'),
-                paid_by_id=data.get('paid_by'),
-                split_type=data.get('split_type', 'equal'),
-                expense_date=data.get('expense_date', timezone.now().date()),
-                notes=data.get('notes', ''),
-                created_by=user,
-                local_id=local_id,
-                last_synced_at=timezone.now()
-            )
-
-            # Create splits
-            splits = data.get('splits', [])
-            for split in splits:
-                ExpenseSplit.objects.create(
-                    expense=expense,
-                    user_id=split.get('user_id'),
-                    amount=split.get('amount'),
-                    percentage=split.get('percentage'),
-                    shares=split.get('shares', 1)
-                )
+            # Create expense and splits
+            expense, splits = self._build_expense(user, group_id, local_id, data)
+            expense.save()
+            ExpenseSplit.objects.bulk_create(splits, batch_size=500)
 
             result['success'] = True
             result['server_id'] = str(expense.id)
-            result['data'] = ExpenseSerializer(expense).data
+            result['data'] = self._expense_data(expense)
 
         elif operation == 'update':
             try:
-                expense = Expense.objects.get(id=entity_id)
+                expense = self._get_expense(entity_id, existing_expenses)
 
                 # Check for conflicts
                 if expense.updated_at > client_timestamp:
@@ -162,7 +337,7 @@ class SyncPushView(APIView):
                     return result
 
                 # Check permission
-                if expense.created_by != user and expense.group.owner != user:
+                if expense.created_by_id != user.id and expense.group.owner_id != user.id:
                     result['error'] = 'Permission denied'
                     return result
 
@@ -177,36 +352,36 @@ class SyncPushView(APIView):
 
                 # Update splits if provided
                 if 'splits' in data:
-                    expense.splits.all().delete()
-                    for split in data['splits']:
-                        ExpenseSplit.objects.create(
-                            expense=expense,
-                            user_id=split.get('user_id'),
-                            amount=split.get('amount'),
-                            percentage=split.get('percentage'),
-                            shares=split.get('shares', 1)
-                        )
+                    ExpenseSplit.objects.filter(expense=expense).delete()
+                    ExpenseSplit.objects.bulk_create(
+                        self._build_splits(expense, data['splits']), batch_size=500
+                    )
 
                 result['success'] = True
-                result['data'] = ExpenseSerializer(expense).data
+                result['data'] = self._expense_data(expense)
 
             except Expense.DoesNotExist:
                 result['error'] = 'Expense not found'
 
         elif operation == 'delete':
-            try:
-                expense = Expense.objects.get(id=entity_id)
-
-                # Check permission
-                if expense.created_by != user and expense.group.owner != user:
-                    result['error'] = 'Permission denied'
-                    return result
-
-                expense.is_deleted = True
-                expense.save(update_fields=['is_deleted', 'updated_at'])
+            # Permission is part of the UPDATE filter, so the success path is one query
+            expense_id = _parse_uuid(entity_id)
+            expenses = Expense.objects.filter(id=expense_id)
+            now = timezone.now()
+            deleted = expense_id is not None and expenses.filter(
+                Q(created_by_id=user.id) | Q(group__owner_id=user.id)
+            ).update(is_deleted=True, updated_at=now)
+
+            if deleted:
+                # Keep a preloaded copy in step so a later update in the batch neither
+                # undoes the delete nor skips the conflict check against it
+                if existing_expenses and expense_id in existing_expenses:
+                    existing_expenses[expense_id].is_deleted = True
+                    existing_expenses[expense_id].updated_at = now
                 result['success'] = True
-
-            except Expense.DoesNotExist:
+            elif expense_id is not None and expenses.exists():
+                result['error'] = 'Permission denied'
+            else:
                 result['error'] = 'Expense not found'
 
         return result
@@ -222,16 +397,15 @@ class SyncPushView(APIView):
             )
 
             # Add owner as member
-            from api.models import GroupMembership
             GroupMembership.objects.create(user=user, group=group, role='owner')
 
             result['success'] = True
             result['server_id'] = str(group.id)
-            result['data'] = GroupSerializer(group).data
+            result['data'] = GroupSerializer(Group.objects.with_stats().get(pk=group.pk)).data
 
         elif operation == 'update':
             try:
-                group = Group.objects.get(id=entity_id, owner=user)
+                group = Group.objects.with_stats().get(id=entity_id, owner=user)
 
                 if group.updated_at > client_timestamp:
                     result['conflict'] = True
@@ -255,13 +429,13 @@ class SyncPushView(APIView):
     def _sync_settlement(self, user, operation, entity_id, local_id, data, client_timestamp, result):
         """Sync a settlement."""
         if operation == 'create':
-            group = Group.objects.filter(id=data.get('group'), members=user).first()
-            if not group:
+            group_id = _parse_uuid(data.get('group'))
+            if not self._is_member(user, group_id):
                 result['error'] = 'Group not found or access denied'
                 return result
 
             settlement = Settlement.objects.create(
-                group=group,
+                group_id=group_id,
                 from_user_id=data.get('from_user'),
                 to_user_id=data.get('to_user'),
                 amount=data.get('amount'),
@@ -279,7 +453,33 @@ class SyncPushView(APIView):
 class SyncPullView(APIView):
     """
     Pull changes from the server.
+    Expenses can be paged with a keyset cursor and are streamed in chunks.
     """
+    # Default and maximum number of expenses per page when paging
+    page_size = 500
+    max_page_size = 1000
+    # Expenses serialized per streamed chunk
+    chunk_size = 500
+
+    # Columns read by the serializers; related users only need UserMinimalSerializer's fields
+    expense_only_fields = (
+        'id', 'group_id', 'description', 'amount', 'currency', 'category_id', 'paid_by_id',
+        'split_type', 'receipt_url', 'notes', 'expense_date', 'is_settled', 'is_deleted',
+        'created_by_id', 'created_at', 'updated_at', 'local_id', 'sync_version',
+        'paid_by__id', 'paid_by__display_name', 'paid_by__avatar_url',
+        'created_by__id', 'created_by__display_name', 'created_by__avatar_url',
+        'category__id', 'category__name', 'category__icon', 'category__color', 'category__is_preset',
+    )
+    group_only_fields = (
+        'id', 'name', 'description', 'owner_id', 'invite_code', 'currency', 'image_url',
+        'is_active', 'created_at', 'updated_at',
+        'owner__id', 'owner__display_name', 'owner__avatar_url',
+    )
+    settlement_only_fields = (
+        'id', 'group_id', 'from_user_id', 'to_user_id', 'amount', 'notes', 'settled_at', 'created_by_id',
+        'from_user__id', 'from_user__display_name', 'from_user__avatar_url',
+        'to_user__id', 'to_user__display_name', 'to_user__avatar_url',
+    )
 
     def get(self, request):
         """
@@ -288,50 +488,151 @@ class SyncPullView(APIView):
         Query params:
         - last_sync: ISO timestamp of last sync
         - group_ids: comma-separated list of group IDs (optional)
+        - limit: page expenses, at most this many per response (optional)
+        - cursor: next_cursor from the previous page (optional)
+
+        Groups and settlements are only returned on the first page. Clients
+        paging through expenses should keep the first page's server_timestamp
+        as their next last_sync.
         """
         last_sync_str = request.query_params.get('last_sync')
         group_ids_str = request.query_params.get('group_ids')
+        limit_str = request.query_params.get('limit')
+        cursor_str = request.query_params.get('cursor')
 
         last_sync = None
         if last_sync_str:
             try:
-                last_sync = datetime.fromisoformat(last_sync_str.replace('Z', '+00:00'))
+                # parse_datetime accepts the trailing 'Z' directly
+                last_sync = parse_datetime(last_sync_str)
             except ValueError:
+                last_sync = None
+            if last_sync is None:
                 return Response(
                     {'error': 'Invalid last_sync timestamp'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-        # Get user's groups
-        user_groups = Group.objects.filter(members=request.user)
-        if group_ids_str:
-            group_ids = group_ids_str.split(',')
-            user_groups = user_groups.filter(id__in=group_ids)
-
-        # Fetch changes
-        changes = {
-            'groups': [],
-            'expenses': [],
-            'settlements': [],
-            'server_timestamp': timezone.now().isoformat()
-        }
+        limit = None
+        if limit_str or cursor_str:
+            try:
+                limit = min(int(limit_str or self.page_size), self.max_page_size)
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                return Response(
+                    {'error': 'Invalid limit'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-        # Groups
-        groups_query = user_groups
-        if last_sync:
-            groups_query = groups_query.filter(updated_at__gt=last_sync)
-        changes['groups'] = GroupSerializer(groups_query, many=True).data
+        cursor = None
+        if cursor_str:
+            try:
+                cursor = self._decode_cursor(cursor_str)
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid cursor'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-        # Expenses
-        expenses_query = Expense.objects.filter(group__in=user_groups)
+        # Get user's groups, looked up once and reused as a flat IN list below
+        user_group_ids = get_user_group_ids(request)
+        if group_ids_str:
+            group_ids = {_parse_uuid(group_id) for group_id in group_ids_str.split(',')}
+            user_group_ids = user_group_ids & group_ids
+
+        server_timestamp = timezone.now().isoformat()
+        groups = []
+        settlements = []
+
+        if cursor is None:
+            # Groups
+            groups_query = Group.objects.filter(id__in=user_group_ids).with_stats().select_related(
+                'owner'
+            ).only(*self.group_only_fields).prefetch_related(
+                Prefetch('groupmembership_set', queryset=GroupMembership.objects.select_related('user').only(
+                    'id', 'group_id', 'role', 'joined_at', 'user__id', 'user__display_name', 'user__avatar_url'
+                ))
+            )
+            if last_sync:
+                groups_query = groups_query.filter(updated_at__gt=last_sync)
+            groups = GroupSerializer(groups_query, many=True).data
+
+            # Settlements
+            settlements_query = Settlement.objects.filter(group_id__in=user_group_ids).select_related(
+                'from_user', 'to_user'
+            ).only(*self.settlement_only_fields)
+            if last_sync:
+                settlements_query = settlements_query.filter(settled_at__gt=last_sync)
+            settlements = SettlementSerializer(settlements_query, many=True).data
+
+        # Expenses, in (updated_at, id) order so pages can resume after the cursor
+        expenses_query = Expense.objects.filter(group_id__in=user_group_ids).select_related(
+            'paid_by', 'created_by', 'category'
+        ).only(*self.expense_only_fields).prefetch_related(
+            Prefetch('splits', queryset=ExpenseSplit.objects.select_related('user').only(
+                'id', 'expense_id', 'user_id', 'amount', 'percentage', 'shares', 'is_settled',
+                'user__id', 'user__display_name', 'user__avatar_url'
+            ))
+        ).order_by('updated_at', 'id')
         if last_sync:
             expenses_query = expenses_query.filter(updated_at__gt=last_sync)
-        changes['expenses'] = ExpenseSerializer(expenses_query, many=True).data
+        if cursor:
+            updated_at, expense_id = cursor
+            expenses_query = expenses_query.filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=expense_id)
+            )
+        if limit:
+            # One extra row tells whether another page follows
+            expenses_query = expenses_query[:limit + 1]
 
-        # Settlements
-        settlements_query = Settlement.objects.filter(group__in=user_groups)
-        if last_sync:
-            settlements_query = settlements_query.filter(settled_at__gt=last_sync)
-        changes['settlements'] = SettlementSerializer(settlements_query, many=True).data
+        return StreamingHttpResponse(
+            self._stream_changes(groups, expenses_query, settlements, server_timestamp, limit),
+            content_type='application/json'
+        )
 
-        return Response(changes)
+    def _stream_changes(self, groups, expenses_query, settlements, server_timestamp, limit):
+        """Yield the pull response JSON, serializing expenses one chunk at a time."""
+        render = ORJSONRenderer().render
+        yield b'{"groups":%s,"expenses":[' % render(groups)
+
+        rows = expenses_query.iterator(chunk_size=self.chunk_size)
+        count = 0
+        last = None
+        has_more = False
+        while not has_more:
+            batch = list(islice(rows, self.chunk_size))
+            if not batch:
+                break
+            if limit and count + len(batch) > limit:
+                batch = batch[:limit - count]
+                has_more = True
+            if batch:
+                chunk = render(ExpenseSerializer(batch, many=True).data)[1:-1]
+                yield (b',' if count else b'') + chunk
+                count += len(batch)
+                last = batch[-1]
+
+        next_cursor = render(self._encode_cursor(last)) if has_more else b'null'
+        yield b'],"settlements":%s,"server_timestamp":%s,"next_cursor":%s}' % (
+            render(settlements), render(server_timestamp), next_cursor
+        )
+
+    @staticmethod
+    def _encode_cursor(expense):
+        """Build an opaque cursor pointing just after the given expense."""
+        position = f'{expense.updated_at.isoformat()},{expense.id}'
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        """Parse a cursor into (updated_at, id); raises ValueError if malformed."""
+        try:
+            position = base64.urlsafe_b64decode(cursor.encode()).decode()
+        except (binascii.Error, UnicodeError) as e:
+            raise ValueError(str(e))
+        updated_at, _, expense_id = position.partition(',')
+        updated_at = parse_datetime(updated_at)
+        if updated_at is None:
+            raise ValueError('Invalid cursor timestamp')
+        return updated_at, uuid.UUID(expense_id)
@@ -108,8 +108,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
+    'DEFAULT_THROTTLE_RATES': {
+        'verify_batch': os.getenv('VERIFY_BATCH_THROTTLE_RATE', '30/minute'),
+    },
 }
 
 # Firebase configuration
@@ -125,5 +132,11 @@ FIREBASE_CREDENTIALS = {
     "token_uri": os.getenv('FIREBASE_TOKEN_URI', 'https://oauth2.googleapis.com/token'),
 }
 
+# Seconds a verified Firebase ID token is cached (bounded by the token's own expiry)
+FIREBASE_TOKEN_CACHE_TTL = int(os.getenv('FIREBASE_TOKEN_CACHE_TTL', '300'))
+
+# Seconds computed group balances are cached (keys change whenever the group's data does)
+BALANCES_CACHE_TTL = int(os.getenv('BALANCES_CACHE_TTL', '3600'))
+
 # Sync configuration
 SYNC_SECRET = os.getenv('SYNC_SECRET', 'default-sync-secret')